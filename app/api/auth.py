@@ -2,6 +2,7 @@ from __future__ import annotations
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from ..core import models
+from ..core.profiling import phase
 
 # 密码哈希上下文
 # Password Hashing Context
@@ -12,14 +13,16 @@ def hash_password(password: str) -> str:
     加密密码
     Hash Password
     """
-    return pwd_context.hash(password)
+    with phase("bcrypt"):
+        return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
     Verify Password
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with phase("bcrypt"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_user_by_email(db: Session, email: str) -> models.User | None:
     """
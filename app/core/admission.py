@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+# 默认的按路由限流配置，可通过 ADMISSION_LIMITS (JSON) 按名称覆盖任意字段
+# Default per-route limits; any field can be overridden by name through ADMISSION_LIMITS (JSON), e.g.
+# ADMISSION_LIMITS='{"generate": {"global_concurrency": 16, "rate_per_minute": 10}}'
+DEFAULT_ROUTE_LIMITS: Dict[str, Dict[str, Any]] = {
+    "generate": {
+        "methods": ["POST"],
+        "path": r"^/resume/generate$",
+        "global_concurrency": 8,
+        "per_user_concurrency": 2,
+        "rate_per_minute": 6,
+        "burst": 3,
+        "max_queue": 16,
+        "queue_timeout": 30.0,
+    },
+    "batch": {
+        "methods": ["POST"],
+        "path": r"^/resume/batch$",
+        "global_concurrency": 2,
+        "per_user_concurrency": 1,
+        "rate_per_minute": 2,
+        "burst": 2,
+        "max_queue": 4,
+        "queue_timeout": 10.0,
+    },
+    "pdf": {
+        "methods": ["GET"],
+        "path": r"^/resume/\d+/pdf$",
+        "global_concurrency": 4,
+        "per_user_concurrency": 2,
+        "rate_per_minute": 30,
+        "burst": 10,
+        "max_queue": 32,
+        "queue_timeout": 10.0,
+    },
+}
+
+class Rejected(Exception):
+    """
+    请求被拒绝 (429 / 503)，附带 Retry-After 秒数
+    Request rejected with a status code (429/503) and a Retry-After hint in seconds
+    """
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多 burst 个
+    Token bucket refilled at `rate` tokens per second, holding at most `burst`
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        取一个令牌；成功返回 0，否则返回需要等待的秒数
+        Take one token; returns 0 on success, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class RouteLimiter:
+    """
+    单条路由规则的准入控制：全局/单用户并发、令牌桶限速、有界等待队列
+    Admission control for one route rule: global and per-user concurrency,
+    per-user token-bucket rate limit and a bounded FIFO wait queue.
+
+    所有状态只在事件循环线程中访问，因此无需加锁。
+    All state is touched from the event loop thread only, so no locking is needed.
+    """
+    # 闲置令牌桶的数量上限，超出后丢弃最早的
+    # Cap on tracked per-user buckets; the oldest are dropped beyond it
+    MAX_BUCKETS = 10_000
+
+    def __init__(
+        self,
+        name: str,
+        methods: List[str],
+        path: str,
+        global_concurrency: int,
+        per_user_concurrency: int,
+        rate_per_minute: float,
+        burst: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        self.name = name
+        self.methods = {m.upper() for m in methods}
+        self.pattern = re.compile(path)
+        self.global_concurrency = max(1, global_concurrency)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        self.user_active: Dict[str, int] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.waiters: Deque[asyncio.Future] = deque()
+
+        # 指标 Metrics
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_rate_limit": 0,
+            "rejected_user_concurrency": 0,
+            "rejected_queue_full": 0,
+            "rejected_queue_timeout": 0,
+        }
+        self.queue_waits: Deque[float] = deque(maxlen=1000)
+        self.avg_service_time = 1.0
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and bool(self.pattern.match(path))
+
+    def _estimated_wait(self) -> float:
+        """
+        估算排到一个空闲槽位所需的时间 (用于 Retry-After)
+        Estimated time until a slot frees up, used for Retry-After
+        """
+        return self.avg_service_time * (len(self.waiters) + 1) / self.global_concurrency
+
+    def _check_rate(self, user_key: str) -> None:
+        if self.rate <= 0:
+            return
+        bucket = self.buckets.pop(user_key, None) or TokenBucket(self.rate, self.burst)
+        self.buckets[user_key] = bucket  # 重新插入到末尾 (LRU 顺序) / re-insert at the end (LRU order)
+        if len(self.buckets) > self.MAX_BUCKETS:
+            self.buckets.pop(next(iter(self.buckets)))
+        wait = bucket.take()
+        if wait:
+            self.counters["rejected_rate_limit"] += 1
+            raise Rejected(429, wait, "rate limit exceeded")
+
+    async def acquire(self, user_key: str) -> None:
+        """
+        获取执行槽位；不满足条件时抛出 Rejected
+        Acquire a slot or raise Rejected
+        """
+        if self.user_active.get(user_key, 0) >= self.per_user_concurrency:
+            self.counters["rejected_user_concurrency"] += 1
+            raise Rejected(429, self.avg_service_time, "too many concurrent requests for this user")
+        self._check_rate(user_key)
+
+        # 占住单用户名额后再排队，避免同一用户在队列中堆积
+        # Reserve the per-user slot before queueing so one user cannot pile up in the queue
+        self.user_active[user_key] = self.user_active.get(user_key, 0) + 1
+        try:
+            if self.active < self.global_concurrency and not self.waiters:
+                self.active += 1
+                self.queue_waits.append(0.0)
+            else:
+                await self._wait_in_queue()
+        except BaseException:
+            self._release_user(user_key)
+            raise
+        self.counters["admitted"] += 1
+
+    async def _wait_in_queue(self) -> None:
+        if len(self.waiters) >= self.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            raise Rejected(503, self._estimated_wait(), "server busy, queue full")
+
+        self.counters["queued"] += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # 超时与交接同时发生：槽位已转交给我们，正常继续
+                # Timed out while the slot was handed over: keep the slot
+                pass
+            else:
+                waiter.cancel()
+                self._discard(waiter)
+                self.counters["rejected_queue_timeout"] += 1
+                raise Rejected(503, self._estimated_wait(), "server busy, timed out in queue")
+        except BaseException:
+            # 客户端断开等情况：若已拿到槽位则归还
+            # Client went away: give the slot back if it was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._discard(waiter)
+            raise
+        self.queue_waits.append(time.monotonic() - start)
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release_slot(self) -> None:
+        """
+        归还全局槽位：优先直接交给队首等待者
+        Release a global slot, handing it straight to the first live waiter
+        """
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _release_user(self, user_key: str) -> None:
+        count = self.user_active.get(user_key, 0) - 1
+        if count > 0:
+            self.user_active[user_key] = count
+        else:
+            self.user_active.pop(user_key, None)
+
+    def release(self, user_key: str, service_time: float) -> None:
+        self.avg_service_time = 0.9 * self.avg_service_time + 0.1 * service_time
+        self._release_user(user_key)
+        self._release_slot()
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self.queue_waits)
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "active": self.active,
+            "queue_length": len(self.waiters),
+            "limits": {
+                "global_concurrency": self.global_concurrency,
+                "per_user_concurrency": self.per_user_concurrency,
+                "rate_per_minute": round(self.rate * 60, 3),
+                "burst": self.burst,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+            },
+            **self.counters,
+            "queue_wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)},
+            "avg_service_time_ms": round(self.avg_service_time * 1000, 1),
+        }
+
+class AdmissionController:
+    """
+    所有路由规则的集合
+    Collection of route limiters
+    """
+    def __init__(self, limits: Dict[str, Dict[str, Any]]):
+        self.limiters = [RouteLimiter(name, **config) for name, config in limits.items()]
+
+    def match(self, method: str, path: str) -> RouteLimiter | None:
+        for limiter in self.limiters:
+            if limiter.matches(method, path):
+                return limiter
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {limiter.name: limiter.metrics() for limiter in self.limiters}
+
+def load_route_limits() -> Dict[str, Dict[str, Any]]:
+    """
+    合并默认规则与 ADMISSION_LIMITS 覆盖项
+    Merge the default rules with ADMISSION_LIMITS overrides
+    """
+    limits = {name: dict(config) for name, config in DEFAULT_ROUTE_LIMITS.items()}
+    if settings.admission_limits:
+        for name, override in json.loads(settings.admission_limits).items():
+            limits.setdefault(name, {}).update(override)
+    return limits
+
+class AdmissionMiddleware:
+    """
+    准入控制 ASGI 中间件。需放在 SessionMiddleware 内层，以便按 user_id 区分用户。
+    Admission-control ASGI middleware. Must sit inside SessionMiddleware so
+    requests can be keyed by the session user_id (client IP for anonymous requests).
+    """
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    @staticmethod
+    def _user_key(scope: Scope) -> str:
+        user_id = (scope.get("session") or {}).get("user_id")
+        if user_id:
+            return f"user:{user_id}"
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else "anonymous"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.controller.match(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        user_key = self._user_key(scope)
+        try:
+            await limiter.acquire(user_key)
+        except Rejected as e:
+            response = PlainTextResponse(
+                f"请求过多，请稍后重试 (Too many requests: {e.reason})",
+                status_code=e.status_code,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release(user_key, time.monotonic() - start)
+
+        async def send_wrapper(message: Message) -> None:
+            await send(message)
+            # 响应发送完毕即归还槽位：之后的 BackgroundTasks 不占用准入名额，也不计入服务时间
+            # Release once the response is fully sent, so BackgroundTasks that run afterwards
+            # neither hold the slot nor inflate avg_service_time / Retry-After
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            release()
+
+_route_limits = load_route_limits()
+
+# 进程级单例 (每个 worker 一份)
+# Process-wide controller (one per worker)
+admission_controller = AdmissionController(_route_limits)
+
+# 模型调用的进程级并发预算，大小为 "generate" 规则的全局并发数。
+# 交互式生成与后台批量任务的每次生成都要占用一个名额，因此批量任务不会绕过生成限额。
+# Process-wide model-call budget sized by the "generate" rule's global concurrency.
+# Every generation, interactive or from a background batch, holds one slot while it
+# runs, so batch workers cannot bypass the generate limits.
+generation_slots = threading.BoundedSemaphore(
+    max(1, int(_route_limits.get("generate", {}).get("global_concurrency", 1)))
+)
+
+def admission_metrics() -> Dict[str, Any]:
+    return admission_controller.metrics()
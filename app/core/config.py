@@ -17,9 +17,56 @@ class Settings(BaseSettings):
     # OpenAI 模型名称
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
     
+    # OpenAI HTTP 连接池：最大连接数、最大空闲 keep-alive 连接数、空闲保活秒数；安装 h2 时启用 HTTP/2
+    # OpenAI HTTP pool: max connections, max idle keep-alive connections, idle expiry (s); HTTP/2 when h2 is installed
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+    openai_max_keepalive: int = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+    openai_keepalive_expiry: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+    openai_http2: bool = os.getenv("OPENAI_HTTP2", "true").lower() in {"1", "true", "yes"}
+
     # Flask/Starlette 会话密钥 (用于 SessionMiddleware)
     session_secret: str = os.getenv("SESSION_SECRET", "change-me-random-string")
     
+    # 运行环境: development / production
+    # Runtime environment: development / production
+    app_env: str = os.getenv("APP_ENV", "development")
+
+    # 模板自动重载 (默认仅开发环境开启) 与 Jinja 字节码缓存目录 (留空则不缓存)
+    # Template auto-reload (dev only by default) and Jinja bytecode cache dir (empty disables it)
+    template_auto_reload: bool = os.getenv(
+        "TEMPLATE_AUTO_RELOAD", "false" if os.getenv("APP_ENV", "development") == "production" else "true"
+    ).lower() in {"1", "true", "yes"}
+    template_cache_dir: str = os.getenv("TEMPLATE_CACHE_DIR", "./.cache/jinja")
+
+    # 响应压缩：小于该字节数的响应不压缩
+    # Response compression: responses smaller than this many bytes are sent as-is
+    compression_min_size: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    gzip_level: int = int(os.getenv("GZIP_LEVEL", "6"))
+    brotli_quality: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
+    # 简历预览片段缓存：内存 LRU 条数，可选磁盘目录 (留空关闭) 及其文件数上限
+    # Preview fragment cache: in-memory LRU size, optional disk dir (empty disables) and its file cap
+    preview_cache_size: int = int(os.getenv("PREVIEW_CACHE_SIZE", "512"))
+    preview_cache_dir: str = os.getenv("PREVIEW_CACHE_DIR", "")
+    preview_cache_disk_max_entries: int = int(os.getenv("PREVIEW_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+    # PDF 预渲染：简历保存后在后台渲染 PDF 并存库 (工作线程数，0 关闭)
+    # PDF pre-rendering: render and store the PDF in the background after a resume is saved (workers, 0 disables)
+    pdf_prerender_workers: int = int(os.getenv("PDF_PRERENDER_WORKERS", "1"))
+
+    # 请求性能分析 (默认关闭)：采样比例、管理员请求头 (值须等于 PROFILING_TOKEN)、慢请求阈值、
+    # 采样间隔、环形缓冲区目录与容量；ADMIN_EMAILS 为可查看 /admin/profiles 的账号 (逗号分隔)
+    # Request profiling (off by default): sample rate, admin header (value must equal PROFILING_TOKEN),
+    # slow threshold, sampler interval, ring buffer dir and size; ADMIN_EMAILS may view /admin/profiles
+    profiling_sample_rate: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    profiling_header: str = os.getenv("PROFILING_HEADER", "X-Profile")
+    profiling_token: str = os.getenv("PROFILING_TOKEN", "")
+    profiling_slow_ms: float = float(os.getenv("PROFILING_SLOW_MS", "1000"))
+    profiling_interval_ms: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    profiling_dir: str = os.getenv("PROFILING_DIR", "./.cache/profiles")
+    profiling_max_entries: int = int(os.getenv("PROFILING_MAX_ENTRIES", "200"))
+    admin_emails: str = os.getenv("ADMIN_EMAILS", "")
+
     # 数据库连接 URL
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
@@ -28,4 +75,33 @@ class Settings(BaseSettings):
     test_user_email: str = os.getenv("TEST_USER_EMAIL", "test@example.com")
     test_user_password: str = os.getenv("TEST_USER_PASSWORD", "test123456")
 
+    # 简历生成模式: single (一次结构化调用) 或 fanout (按分段并发调用后合并)
+    # Generation mode: single (one structured call) or fanout (concurrent per-section calls)
+    generation_mode: str = os.getenv("GENERATION_MODE", "single")
+
+    # fanout 模式下同时进行的分段调用上限 (进程级)
+    # Max in-flight section calls in fanout mode (per process)
+    fanout_max_concurrency: int = int(os.getenv("FANOUT_MAX_CONCURRENCY", "4"))
+
+    # 批量定制：单次最多 JD 数量与并发生成数
+    # Batch tailoring: max job descriptions per batch and concurrent generations
+    batch_max_jobs: int = int(os.getenv("BATCH_MAX_JOBS", "30"))
+    batch_max_concurrency: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+    # 超过该秒数未更新的 pending/running/importing 任务视为已中断 (进程重启或崩溃)，启动及轮询时恢复
+    # Batches in pending/running/importing not updated for this many seconds are treated as
+    # abandoned (restart or crash) and recovered at startup and when polled
+    batch_stale_seconds: int = int(os.getenv("BATCH_STALE_SECONDS", "600"))
+
+    # 准入控制 (并发/限速)；ADMISSION_LIMITS 为 JSON，按路由名覆盖默认规则
+    # Admission control; ADMISSION_LIMITS is JSON overriding the default rules by route name
+    admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() in {"1", "true", "yes"}
+    admission_limits: str = os.getenv("ADMISSION_LIMITS", "")
+
+    # OpenAI 健康探测：探测间隔 (秒，0 关闭)、滚动窗口样本数、手动探测最小间隔、单次超时
+    # OpenAI health probe: interval (s, 0 disables), rolling window size, manual re-probe debounce, per-probe timeout
+    health_probe_interval: float = float(os.getenv("HEALTH_PROBE_INTERVAL", "60"))
+    health_probe_window: int = int(os.getenv("HEALTH_PROBE_WINDOW", "30"))
+    health_probe_min_interval: float = float(os.getenv("HEALTH_PROBE_MIN_INTERVAL", "10"))
+    health_probe_timeout: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
 settings = Settings()
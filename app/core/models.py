@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime as dt
 from typing import List
 
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -19,6 +19,10 @@ class User(Base):
         back_populates="user",
         cascade="all, delete-orphan"
     )
+    batch_jobs: Mapped[List["BatchJob"]] = relationship(
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
 
 class Resume(Base):
     __tablename__ = "resumes"
@@ -30,5 +34,55 @@ class Resume(Base):
     input_json: Mapped[str] = mapped_column(Text, nullable=False)
     output_json: Mapped[str] = mapped_column(Text, nullable=False)
     ai_usage: Mapped[str] = mapped_column(Text, nullable=True)
+    # output_json + ai_usage 的内容哈希 (预览缓存键 / ETag)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
+    # output_json 的存储格式版本 (见 services/resumes.py RESUME_SCHEMA_VERSION)
+    output_version: Mapped[int] = mapped_column(Integer, nullable=True)
+    batch_id: Mapped[int] = mapped_column(Integer, ForeignKey("batch_jobs.id"), index=True, nullable=True)
 
     user: Mapped["User"] = relationship(back_populates="resumes")
+
+class BatchJob(Base):
+    """
+    批量定制任务：一份个人资料 + 多个 JD
+    Batch tailoring job: one profile against many job descriptions
+    """
+    __tablename__ = "batch_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    # 最近一次状态/进度写入时间 (运行中定期刷新)，用于识别中断的任务
+    # Last status/progress write (refreshed while running), used to detect abandoned batches
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow, nullable=True
+    )
+
+    # pending / running / submitted (provider batch) / importing / completed / failed
+    status: Mapped[str] = mapped_column(String(32), default="pending", nullable=False)
+    # online (并发实时调用) / provider (OpenAI Batch API)
+    mode: Mapped[str] = mapped_column(String(32), default="online", nullable=False)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    provider_batch_id: Mapped[str] = mapped_column(String(255), nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+
+    # {"profile": {...}, "job_descs": [...], "model": ..., "generation_mode": ...}
+    input_json: Mapped[str] = mapped_column(Text, nullable=False)
+
+    user: Mapped["User"] = relationship(back_populates="batch_jobs")
+
+class PdfRender(Base):
+    """
+    预渲染的 PDF：按简历内容哈希与渲染器版本存储 (旧版本与无对应简历的记录在启动时清理)
+    Pre-rendered PDFs keyed by resume content hash and renderer version
+    (rows from older versions or without a matching resume are pruned at startup)
+    """
+    __tablename__ = "pdf_renders"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    renderer_version: Mapped[str] = mapped_column(String(16), primary_key=True)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+    pdf: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
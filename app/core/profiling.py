@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+class RequestProfile:
+    """
+    单个请求的性能数据：分阶段耗时 + 采样得到的调用栈
+    Per-request profile: per-phase timings plus sampled call stacks
+    """
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = time.time()
+        self.status = 0
+        self.total_ms = 0.0
+        # 阶段名 -> [累计毫秒, 次数]
+        # phase name -> [total ms, count]
+        self.phases: Dict[str, List[float]] = {}
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        # 正在为该请求工作的线程 (事件循环线程 + 同步路由所在的线程池线程)
+        # Threads currently working on this request (event loop + threadpool thread of a sync route)
+        self.threads: set[int] = set()
+        self._lock = threading.Lock()
+
+    def add_phase(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += elapsed_ms
+            entry[1] += 1
+
+    def to_dict(self, top_stacks: int = 40) -> Dict[str, Any]:
+        with self._lock:
+            phases = {
+                name: {"ms": round(ms, 2), "count": count}
+                for name, (ms, count) in sorted(self.phases.items(), key=lambda item: -item[1][0])
+            }
+            accounted = sum(ms for ms, _ in self.phases.values())
+            stacks = self.stacks.most_common(top_stacks)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "total_ms": round(self.total_ms, 2),
+            "phases": phases,
+            "other_ms": round(max(0.0, self.total_ms - accounted), 2),
+            "samples": self.samples,
+            "sample_interval_ms": settings.profiling_interval_ms,
+            "stacks": [{"stack": stack, "count": count} for stack, count in stacks],
+        }
+
+# 当前请求的 profile (未被采样的请求为 None，分阶段计时几乎零开销)
+# Profile of the current request (None when not sampled, so phase timing is nearly free)
+_current_profile: contextvars.ContextVar[RequestProfile | None] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+def current_profile() -> RequestProfile | None:
+    return _current_profile.get()
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    记录一段代码的耗时到当前请求的 profile (bcrypt / db / json / pdf / openai ...)
+    Attribute the wrapped block's wall time to a named phase of the current request's profile
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(name, (time.perf_counter() - start) * 1000)
+
+class StackSampler:
+    """
+    低开销采样器：仅在有被采样请求时运行，按固定间隔读取相关线程的调用栈
+    Low-overhead sampler: runs only while profiled requests are in flight and
+    periodically reads the stacks of the threads working on them.
+    """
+    def __init__(self, interval_ms: float, max_depth: int = 64):
+        self.interval = max(0.001, interval_ms / 1000)
+        self.max_depth = max_depth
+        self._active: set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.discard(profile)
+
+    def _collapse(self, frame) -> str:
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def _run(self) -> None:
+        while True:
+            # 先清除唤醒标志再读取 _active (同一把锁内)：并发的 add() 要么被这次读取看到，
+            # 要么在清除之后 set()，不会丢失唤醒
+            # Clear the wake flag before reading _active, under the same lock: a concurrent
+            # add() is either seen by this read or sets the flag after the clear, so no wakeup is lost
+            with self._lock:
+                self._wake.clear()
+                active = list(self._active)
+            if not active:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for profile in active:
+                stacks = [
+                    self._collapse(frames[thread_id])
+                    for thread_id in list(profile.threads) if thread_id in frames
+                ]
+                with profile._lock:
+                    profile.stacks.update(stacks)
+                    profile.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+class ProfileStore:
+    """
+    慢请求 profile 的磁盘环形缓冲区：固定数量的槽位文件，写满后覆盖最旧的一份
+    On-disk ring buffer of slow-request profiles: a fixed number of slot files, oldest overwritten first
+    """
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = Path(directory) if directory else None
+        self.max_entries = max(1, max_entries)
+        self._next_slot: int | None = None
+        self._lock = threading.Lock()
+
+    def _slot_path(self, slot: int) -> Path:
+        return self.directory / f"slot-{slot:05d}.json"
+
+    def _initial_slot(self) -> int:
+        # 从最近写入的槽位之后继续 (进程重启后保持环形顺序)
+        # Continue after the most recently written slot so restarts keep the ring order
+        newest, newest_mtime = -1, -1.0
+        for slot in range(self.max_entries):
+            try:
+                mtime = self._slot_path(slot).stat().st_mtime
+            except OSError:
+                continue
+            if mtime > newest_mtime:
+                newest, newest_mtime = slot, mtime
+        return (newest + 1) % self.max_entries
+
+    def save(self, data: Dict[str, Any]) -> None:
+        if self.directory is None:
+            return
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self._next_slot is None:
+                self._next_slot = self._initial_slot()
+            slot = self._next_slot
+            self._next_slot = (slot + 1) % self.max_entries
+            path = self._slot_path(slot)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+
+    def _load_all(self) -> List[Dict[str, Any]]:
+        if self.directory is None or not self.directory.is_dir():
+            return []
+        profiles = []
+        for path in self.directory.glob("slot-*.json"):
+            try:
+                profiles.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        按时间倒序返回所有 profile 的摘要 (不含调用栈)
+        Summaries of all stored profiles, newest first (stacks omitted)
+        """
+        profiles = sorted(self._load_all(), key=lambda p: p.get("started_at", 0), reverse=True)
+        return [{key: value for key, value in p.items() if key != "stacks"} for p in profiles]
+
+    def get(self, profile_id: str) -> Dict[str, Any] | None:
+        for profile in self._load_all():
+            if profile.get("id") == profile_id:
+                return profile
+        return None
+
+sampler = StackSampler(settings.profiling_interval_ms)
+profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_entries)
+
+class ProfilingMiddleware:
+    """
+    按比例 (PROFILING_SAMPLE_RATE) 或携带管理员请求头 (PROFILING_HEADER = PROFILING_TOKEN) 采样请求；
+    超过 PROFILING_SLOW_MS 的请求 (以及请求头强制的请求) 写入环形缓冲区。
+    Profiles a PROFILING_SAMPLE_RATE fraction of requests, or any request carrying the
+    admin header (PROFILING_HEADER set to PROFILING_TOKEN). Profiles of requests slower
+    than PROFILING_SLOW_MS, and all header-forced ones, are saved to the ring buffer.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.sample_rate = settings.profiling_sample_rate
+        self.header = settings.profiling_header.lower().encode("latin-1")
+        self.token = settings.profiling_token.encode("latin-1")
+
+    def _reason(self, scope: Scope) -> str | None:
+        if self.token:
+            for name, value in scope.get("headers") or ():
+                if name == self.header and value == self.token:
+                    return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], reason)
+        loop_thread = threading.get_ident()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if reason == "header":
+                    message.setdefault("headers", []).append((b"x-profile-id", profile.id.encode("latin-1")))
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profile.threads.add(loop_thread)
+        sampler.add(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.total_ms = (time.perf_counter() - start) * 1000
+            sampler.remove(profile)
+            profile.threads.discard(loop_thread)
+            _current_profile.reset(token)
+            if reason == "header" or profile.total_ms >= settings.profiling_slow_ms:
+                try:
+                    profile_store.save(profile.to_dict())
+                except OSError as e:
+                    print(f"Failed to save profile {profile.id}: {e}")
+
+def _bind_thread(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    同步路由在线程池中运行：执行期间把该线程登记到当前 profile，供采样器读取
+    Sync routes run in the threadpool: register that thread on the current profile while the route runs
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        thread_id = threading.get_ident()
+        profile.threads.add(thread_id)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.threads.discard(thread_id)
+
+    return wrapper
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRouter(route_class=ProfiledRoute)：让采样器能看到同步路由所在的线程
+    APIRouter(route_class=ProfiledRoute) lets the sampler see the thread running a sync route
+    """
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, endpoint, **kwargs)
+        # 依赖分析基于原函数完成后再替换调用对象 (保留原函数的签名与注解解析)
+        # Swap the callable only after dependency analysis so signatures and annotations resolve as usual
+        self.dependant.call = _bind_thread(self.dependant.call)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.add_phase("db", (time.perf_counter() - starts.pop()) * 1000)
+
+def instrument_engine(engine) -> None:
+    """
+    SQL 执行耗时计入 "db" 阶段 (重复调用不会重复注册)
+    Attribute SQL execution time to the "db" phase (idempotent)
+    """
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def profiling_enabled() -> bool:
+    return settings.profiling_sample_rate > 0 or bool(settings.profiling_token)
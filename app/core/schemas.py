@@ -46,3 +46,23 @@ class ResumeOut(BaseModel):
     education: List[EducationItem] = Field(default_factory=list)
     certifications: List[str] = Field(default_factory=list)
     additional: List[str] = Field(default_factory=list)
+
+# 并行分段生成 (fan-out) 使用的分段模式，合并后得到 ResumeOut
+# Per-section schemas used by fan-out generation, merged back into ResumeOut
+class ProfileSection(BaseModel):
+    language: str = Field(default="zh", description="zh or en")
+    contact: Contact = Field(default_factory=Contact)
+    headline: str = ""
+    summary: str = ""
+
+class ExperienceSection(BaseModel):
+    experience: List[ExperienceItem] = Field(default_factory=list)
+
+class ProjectsSection(BaseModel):
+    projects: List[ProjectItem] = Field(default_factory=list)
+
+class EducationSkillsSection(BaseModel):
+    education: List[EducationItem] = Field(default_factory=list)
+    skills: List[str] = Field(default_factory=list)
+    certifications: List[str] = Field(default_factory=list)
+    additional: List[str] = Field(default_factory=list)
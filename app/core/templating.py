@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from starlette.datastructures import QueryParams
+from starlette.responses import Response
+from starlette.types import Scope
+
+from .config import settings
+
+# 项目根目录 Project Root
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+STATIC_DIR = BASE_DIR / "static"
+
+# 带指纹 (?v=<hash>) 的静态资源可以永久缓存
+# Fingerprinted (?v=<hash>) assets can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+# 静态文件内容哈希缓存: 路径 -> (mtime_ns, hash)
+# Content-hash cache for static files: path -> (mtime_ns, hash)
+_asset_hashes: Dict[str, Tuple[int, str]] = {}
+
+def asset_hash(path: str) -> str:
+    """
+    计算静态文件内容哈希 (文件未变化时复用缓存)
+    Content hash of a static file, reused while the file is unchanged
+    """
+    full_path = STATIC_DIR / path
+    try:
+        mtime = full_path.stat().st_mtime_ns
+    except OSError:
+        return ""
+    cached = _asset_hashes.get(path)
+    if cached and (cached[0] == mtime or not settings.template_auto_reload):
+        return cached[1]
+    digest = hashlib.sha256(full_path.read_bytes()).hexdigest()[:12]
+    _asset_hashes[path] = (mtime, digest)
+    return digest
+
+def static_url(path: str) -> str:
+    """
+    模板中使用的带内容指纹的静态资源 URL
+    Fingerprinted static asset URL for templates: /static/<path>?v=<content hash>
+    """
+    digest = asset_hash(path)
+    return f"/static/{path}?v={digest}" if digest else f"/static/{path}"
+
+class FingerprintedStaticFiles(StaticFiles):
+    """
+    指纹与当前内容一致时返回 immutable 长缓存头，否则要求重新验证
+    Serves immutable long-lived caching when the ?v= fingerprint matches the
+    current content, and must-revalidate otherwise.
+    """
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        version = QueryParams(scope.get("query_string", b"")).get("v")
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        if version and version == asset_hash(relative):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
+
+def _create_environment() -> Environment:
+    """
+    全局共享的 Jinja 环境：磁盘字节码缓存，生产环境关闭自动重载
+    Shared Jinja environment with an on-disk bytecode cache; auto-reload is off in production
+    """
+    bytecode_cache = None
+    if settings.template_cache_dir:
+        cache_dir = Path(settings.template_cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+    env = Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)),
+        autoescape=True,
+        auto_reload=settings.template_auto_reload,
+        bytecode_cache=bytecode_cache,
+        cache_size=400,
+    )
+    env.globals["static_url"] = static_url
+    return env
+
+# 全进程共享的模板对象 (main 与各 router 共用)
+# Process-wide templates shared by main and all routers
+templates = Jinja2Templates(env=_create_environment())
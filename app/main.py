@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, Request, Form, Depends
-from fastapi.responses import RedirectResponse, HTMLResponse, Response
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from fastapi import FastAPI, APIRouter, Request, Form, Depends, BackgroundTasks
+from fastapi.responses import RedirectResponse, HTMLResponse, Response, JSONResponse
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy.orm import Session
-from pathlib import Path
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, defer
 import json
 
 # 更新模块引用 to core, api, services
@@ -14,17 +18,44 @@ import json
 from .core.config import settings
 from .core.db import Base, engine, get_db, SessionLocal
 from .core import models
-from .core.schemas import ResumeOut
+from .core.admission import AdmissionMiddleware, admission_controller, admission_metrics
+from .core.templating import templates, FingerprintedStaticFiles, STATIC_DIR
+from .core.profiling import (
+    ProfiledRoute,
+    ProfilingMiddleware,
+    instrument_engine,
+    phase,
+    profile_store,
+    profiling_enabled,
+)
 
 from .api.auth import get_user_by_email, create_user, verify_password
-from .services.openai_client import generate_resume, test_api_connection
-from .services.pdf_export import build_resume_pdf
-
-# 创建数据库表
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+from .services.openai_client import generate_resume, get_client, load_system_prompt, warm_response_formats
+from .services.pdf_export import register_fonts
+from .services.pdf_renders import pdf_for_resume, prune_pdf_renders, shutdown_prerender
+from .services.health import openai_prober
+from .services.resumes import (
+    create_resume,
+    compute_content_hash,
+    migrate_stored_resumes,
+    RESUME_SCHEMA_VERSION,
+)
+from .services.preview_cache import render_preview, preview_etag
+from .services.search import ensure_search_index, search_resumes, search_enabled
+from .services.batch import (
+    split_job_descs,
+    job_title,
+    create_batch_job,
+    run_batch,
+    sync_provider_batch,
+    recover_batch_if_stale,
+    recover_stale_batches,
+    batch_progress,
+)
 
-app = FastAPI(title="Resume Builder")
+# 所有页面路由注册在 router 上，由 create_app() 挂载
+# All routes live on this router and are mounted by create_app()
+router = APIRouter(route_class=ProfiledRoute)
 
 def ensure_db_schema() -> None:
     """
@@ -38,6 +69,60 @@ def ensure_db_schema() -> None:
         cols = {row[1] for row in result.fetchall()}
         if "ai_usage" not in cols:
             conn.exec_driver_sql("ALTER TABLE resumes ADD COLUMN ai_usage TEXT")
+        if "batch_id" not in cols:
+            conn.exec_driver_sql("ALTER TABLE resumes ADD COLUMN batch_id INTEGER REFERENCES batch_jobs(id)")
+            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_resumes_batch_id ON resumes (batch_id)")
+        if "content_hash" not in cols:
+            conn.exec_driver_sql("ALTER TABLE resumes ADD COLUMN content_hash VARCHAR(64)")
+            # 一次性回填旧数据的内容哈希
+            # One-time backfill of content hashes for existing rows
+            rows = conn.exec_driver_sql("SELECT id, output_json, ai_usage FROM resumes").fetchall()
+            for row_id, output_json, ai_usage in rows:
+                conn.exec_driver_sql(
+                    "UPDATE resumes SET content_hash = ? WHERE id = ?",
+                    (compute_content_hash(output_json, ai_usage), row_id),
+                )
+        if "output_version" not in cols:
+            conn.exec_driver_sql("ALTER TABLE resumes ADD COLUMN output_version INTEGER")
+        batch_cols = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(batch_jobs)").fetchall()}
+        if "updated_at" not in batch_cols:
+            conn.exec_driver_sql("ALTER TABLE batch_jobs ADD COLUMN updated_at DATETIME")
+        conn.commit()
+
+def migrate_resume_outputs() -> None:
+    """
+    旧格式 output_json 一次性升级到当前版本 (所有数据库后端)
+    One-time upgrade of older output_json shapes to the current version (every database backend)
+    """
+    with engine.connect() as conn:
+        migrated = migrate_stored_resumes(conn)
+    if migrated:
+        print(f"Migrated {migrated} resumes to output format v{RESUME_SCHEMA_VERSION}")
+
+# 多个 worker 同时启动时 DDL 可能冲突，失败后重试的次数
+# Retries for DDL that races with other workers starting at the same time
+DB_INIT_ATTEMPTS = 5
+
+def init_database() -> None:
+    """
+    建表、补齐旧库字段、迁移旧格式简历、建立全文索引 (在 lifespan 中执行，而不是 import 时)
+    Create tables, backfill columns, migrate stored resumes and build the search index
+    (run from the lifespan, not at import).
+    DDL 与其他 worker 冲突时重试；create_all / IF NOT EXISTS 会跳过已完成的部分。
+    DDL that races with another worker is retried; create_all and IF NOT EXISTS skip finished steps.
+    """
+    for attempt in range(1, DB_INIT_ATTEMPTS + 1):
+        try:
+            Base.metadata.create_all(bind=engine)
+            ensure_db_schema()
+            migrate_resume_outputs()
+            ensure_search_index()
+            break
+        except OperationalError as e:
+            if attempt == DB_INIT_ATTEMPTS:
+                raise
+            print(f"DB init attempt {attempt} failed, retrying: {e}")
+            time.sleep(0.2 * attempt)
 
 def ensure_test_user() -> None:
     """
@@ -54,28 +139,81 @@ def ensure_test_user() -> None:
     try:
         if not get_user_by_email(db, email):
             create_user(db, email, password)
+    except IntegrityError:
+        # 另一个 worker 已经创建 / Another worker created it first
+        db.rollback()
     finally:
         db.close()
 
-@app.on_event("startup")
-def startup_seed_test_user() -> None:
-    ensure_db_schema()
-    ensure_test_user()
-# 配置 Session 中间件
-# Session Middleware Configuration
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.session_secret,
-    session_cookie="resume_builder_session",
-    same_site="lax",
-    https_only=False,  # 生产环境请设为 True
-)
-
-# 挂载静态文件和模板
-# Mount static files and templates
-BASE_DIR = Path(__file__).resolve().parent.parent  # 项目根目录 Project Root
-app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+def _open_db_pool() -> None:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+
+def _load_templates() -> None:
+    for name in templates.env.list_templates(extensions=["html"]):
+        templates.env.get_template(name)
+
+def warm_up() -> Dict[str, float]:
+    """
+    预热：加载 Prompt、注册字体、编译模板、打开数据库连接池、创建 OpenAI 客户端、构建结构化输出 Schema
+    Warm-up: load prompts, register fonts, compile templates, open the DB pool, create the OpenAI client, build structured-output schemas
+    Returns: {step: milliseconds}
+    """
+    steps: Dict[str, float] = {}
+    for name, step in (
+        ("prompts", load_system_prompt),
+        ("fonts", register_fonts),
+        ("templates", _load_templates),
+        ("db_pool", _open_db_pool),
+        ("openai_client", get_client),
+        ("response_schemas", warm_response_formats),
+    ):
+        start = time.perf_counter()
+        step()
+        steps[name] = round((time.perf_counter() - start) * 1000, 1)
+    return steps
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    启动：先完成建表 (必须在处理请求前)，再在后台预热；预热完成后 /readyz 才返回就绪
+    Startup: schema setup completes before serving; warm-up then runs in the
+    background and /readyz reports ready only once it has finished.
+    """
+    started = time.perf_counter()
+    app.state.ready = False
+    app.state.warmup = {}
+    app.state.warmup_error = None
+
+    await asyncio.to_thread(init_database)
+    await asyncio.to_thread(ensure_test_user)
+    await asyncio.to_thread(recover_stale_batches)
+    await asyncio.to_thread(prune_pdf_renders)
+    app.state.init_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    async def run_warm_up() -> None:
+        try:
+            app.state.warmup = await asyncio.to_thread(warm_up)
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+            app.state.warmup_error = str(e)
+            return
+        app.state.ready = True
+        # 客户端已就绪后再启动健康探测线程
+        # Start the health prober once the client exists
+        openai_prober.start()
+        app.state.startup_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"Ready in {app.state.startup_ms}ms (init {app.state.init_ms}ms, warm-up {app.state.warmup})")
+
+    warm_up_task = asyncio.create_task(run_warm_up())
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await warm_up_task
+        await asyncio.to_thread(openai_prober.stop)
+        await asyncio.to_thread(shutdown_prerender)
+        engine.dispose()
 
 def require_login(request: Request) -> int | None:
     """
@@ -84,7 +222,7 @@ def require_login(request: Request) -> int | None:
     """
     return request.session.get("user_id")
 
-@app.get("/", response_class=HTMLResponse)
+@router.get("/", response_class=HTMLResponse)
 def home(request: Request):
     """
     首页重定向
@@ -94,7 +232,7 @@ def home(request: Request):
         return RedirectResponse(url="/dashboard", status_code=302)
     return RedirectResponse(url="/login", status_code=302)
 
-@app.get("/register", response_class=HTMLResponse)
+@router.get("/register", response_class=HTMLResponse)
 def register_page(request: Request):
     """
     注册页面
@@ -104,7 +242,7 @@ def register_page(request: Request):
         return RedirectResponse(url="/dashboard", status_code=302)
     return templates.TemplateResponse("register.html", {"request": request, "title": "注册 Register"})
 
-@app.post("/register", response_class=HTMLResponse)
+@router.post("/register", response_class=HTMLResponse)
 def register(
     request: Request,
     email: str = Form(...),
@@ -127,7 +265,7 @@ def register(
     request.session["user_id"] = user.id
     return RedirectResponse(url="/dashboard", status_code=302)
 
-@app.get("/login", response_class=HTMLResponse)
+@router.get("/login", response_class=HTMLResponse)
 def login_page(request: Request):
     """
     登录页面
@@ -137,7 +275,7 @@ def login_page(request: Request):
         return RedirectResponse(url="/dashboard", status_code=302)
     return templates.TemplateResponse("login.html", {"request": request, "title": "登录 Login"})
 
-@app.post("/login", response_class=HTMLResponse)
+@router.post("/login", response_class=HTMLResponse)
 def login(
     request: Request,
     email: str = Form(...),
@@ -158,7 +296,7 @@ def login(
     request.session["user_id"] = user.id
     return RedirectResponse(url="/dashboard", status_code=302)
 
-@app.get("/logout")
+@router.get("/logout")
 def logout(request: Request):
     """
     退出登录
@@ -167,7 +305,7 @@ def logout(request: Request):
     request.session.clear()
     return RedirectResponse(url="/login", status_code=302)
 
-@app.post("/logout")
+@router.post("/logout")
 def logout_post(request: Request):
     """
     退出登录 (POST)
@@ -176,7 +314,7 @@ def logout_post(request: Request):
     request.session.clear()
     return RedirectResponse(url="/login", status_code=302)
 
-@app.get("/dashboard", response_class=HTMLResponse)
+@router.get("/dashboard", response_class=HTMLResponse)
 def dashboard(request: Request, db: Session = Depends(get_db)):
     """
     用户仪表盘（简历列表）
@@ -194,7 +332,7 @@ def dashboard(request: Request, db: Session = Depends(get_db)):
         "title": "仪表盘 Dashboard"
     })
 
-@app.get("/resume/new", response_class=HTMLResponse)
+@router.get("/resume/new", response_class=HTMLResponse)
 def new_resume_page(request: Request):
     """
     新建简历页面
@@ -204,7 +342,7 @@ def new_resume_page(request: Request):
         return RedirectResponse(url="/login", status_code=302)
     return templates.TemplateResponse("resume.html", {"request": request, "title": "创建简历 Create Resume"})
 
-@app.post("/resume/generate", response_class=HTMLResponse)
+@router.post("/resume/generate", response_class=HTMLResponse)
 def generate_resume_endpoint(
     request: Request,
     # 结构化字段
@@ -224,6 +362,7 @@ def generate_resume_endpoint(
     free_text: str = Form("", alias="free_text"),
     job_desc: str = Form("", alias="job_desc"),
     openai_model: str = Form("gpt-4o-2024-08-06", alias="openai_model"),
+    generation_mode: str = Form("", alias="generation_mode"),
     db: Session = Depends(get_db)
 ):
     """
@@ -236,23 +375,25 @@ def generate_resume_endpoint(
 
     # 1. 组合所有信息调用 Agent
     # Combine all inputs and call Agent
-    resume_out, ai_usage = generate_resume(
-        name=name,
-        email=contact_email,
-        phone=phone,
-        location=location,
-        linkedin=linkedin,
-        github=github,
-        website=website,
-        headline=headline,
-        skills=skills,
-        experience_text=experience_text,
-        education_text=education_text,
-        free_text=free_text,
-        job_desc=job_desc,
-        language=language,
-        model_name=openai_model
-    )
+    with phase("openai"):
+        resume_out, ai_usage = generate_resume(
+            name=name,
+            email=contact_email,
+            phone=phone,
+            location=location,
+            linkedin=linkedin,
+            github=github,
+            website=website,
+            headline=headline,
+            skills=skills,
+            experience_text=experience_text,
+            education_text=education_text,
+            free_text=free_text,
+            job_desc=job_desc,
+            language=language,
+            model_name=openai_model,
+            mode=generation_mode or None
+        )
 
     # 2. 保存到数据库
     # Save to DB
@@ -269,19 +410,183 @@ def generate_resume_endpoint(
        "language": language
     }
     
-    new_resume = models.Resume(
-        user_id=user_id,
-        input_json=json.dumps(input_data, ensure_ascii=False),
-        output_json=resume_out.model_dump_json(), # Pydantic v2
-        ai_usage=json.dumps(ai_usage, ensure_ascii=False)
+    new_resume = create_resume(
+        db, user_id=user_id, input_data=input_data, resume_out=resume_out, ai_usage=ai_usage
     )
-    db.add(new_resume)
-    db.commit()
-    db.refresh(new_resume)
 
     return RedirectResponse(url=f"/resume/{new_resume.id}", status_code=302)
 
-@app.get("/resume/{resume_id}", response_class=HTMLResponse)
+@router.get("/resume/search", response_class=HTMLResponse)
+def search_page(request: Request, q: str = "", db: Session = Depends(get_db)):
+    """
+    全文检索我的简历
+    Full-Text Search over My Resumes
+    """
+    user_id = require_login(request)
+    if not user_id:
+        return RedirectResponse(url="/login", status_code=302)
+
+    results = search_resumes(db, user_id, q) if q.strip() else []
+
+    return templates.TemplateResponse("search.html", {
+        "request": request,
+        "q": q,
+        "results": results,
+        "search_enabled": search_enabled(),
+        "title": "搜索 Search"
+    })
+
+@router.get("/resume/batch", response_class=HTMLResponse)
+def batch_page(request: Request, db: Session = Depends(get_db)):
+    """
+    批量定制页面（一份资料 + 多个 JD）
+    Batch Tailoring Page (one profile, many job descriptions)
+    """
+    user_id = require_login(request)
+    if not user_id:
+        return RedirectResponse(url="/login", status_code=302)
+
+    batches = db.query(models.BatchJob).filter(
+        models.BatchJob.user_id == user_id
+    ).order_by(models.BatchJob.id.desc()).all()
+
+    return templates.TemplateResponse("batch.html", {
+        "request": request,
+        "batches": batches,
+        "max_jobs": settings.batch_max_jobs,
+        "title": "批量定制 Batch Tailoring"
+    })
+
+@router.post("/resume/batch", response_class=HTMLResponse)
+def create_batch_endpoint(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    name: str = Form(...),
+    contact_email: str = Form(...),
+    phone: str = Form(""),
+    location: str = Form(""),
+    linkedin: str = Form(""),
+    github: str = Form(""),
+    website: str = Form(""),
+    headline: str = Form(""),
+    skills: str = Form(""),
+    language: str = Form("zh"),
+    experience_text: str = Form(""),
+    education_text: str = Form(""),
+    free_text: str = Form(""),
+    job_descs: str = Form(""),
+    openai_model: str = Form("gpt-4o-2024-08-06"),
+    generation_mode: str = Form(""),
+    use_provider_batch: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    """
+    创建批量定制任务，后台有界并发生成
+    Create a batch tailoring job; generation runs in the background with bounded concurrency
+    """
+    user_id = require_login(request)
+    if not user_id:
+        return RedirectResponse(url="/login", status_code=302)
+
+    jobs = split_job_descs(job_descs)
+    if not jobs or len(jobs) > settings.batch_max_jobs:
+        batches = db.query(models.BatchJob).filter(
+            models.BatchJob.user_id == user_id
+        ).order_by(models.BatchJob.id.desc()).all()
+        return templates.TemplateResponse("batch.html", {
+            "request": request,
+            "batches": batches,
+            "max_jobs": settings.batch_max_jobs,
+            "error": f"请提供 1-{settings.batch_max_jobs} 个 JD (Provide 1-{settings.batch_max_jobs} job descriptions)",
+            "title": "批量定制 Batch Tailoring"
+        }, status_code=400)
+
+    profile = {
+        "name": name,
+        "email": contact_email,
+        "phone": phone,
+        "location": location,
+        "linkedin": linkedin,
+        "github": github,
+        "website": website,
+        "headline": headline,
+        "skills": skills,
+        "experience_text": experience_text,
+        "education_text": education_text,
+        "free_text": free_text,
+        "language": language,
+    }
+    batch = create_batch_job(
+        db,
+        user_id=user_id,
+        profile=profile,
+        job_descs=jobs,
+        model_name=openai_model,
+        generation_mode=generation_mode,
+        use_provider_batch=use_provider_batch,
+    )
+    background_tasks.add_task(run_batch, batch.id)
+
+    return RedirectResponse(url=f"/resume/batch/{batch.id}", status_code=302)
+
+def _get_user_batch(db: Session, user_id: int, batch_id: int) -> models.BatchJob | None:
+    """
+    查询当前用户的批量任务 (provider 模式下顺便同步进度)
+    Load the user's batch job, syncing provider progress when applicable
+    """
+    batch = db.query(models.BatchJob).filter(
+        models.BatchJob.id == batch_id,
+        models.BatchJob.user_id == user_id
+    ).first()
+    if batch:
+        recover_batch_if_stale(db, batch)
+        sync_provider_batch(db, batch)
+    return batch
+
+@router.get("/resume/batch/{batch_id}", response_class=HTMLResponse)
+def batch_detail(request: Request, batch_id: int, db: Session = Depends(get_db)):
+    """
+    批量任务进度与结果
+    Batch Progress and Results
+    """
+    user_id = require_login(request)
+    if not user_id:
+        return RedirectResponse(url="/login", status_code=302)
+
+    batch = _get_user_batch(db, user_id, batch_id)
+    if not batch:
+        return Response("Batch not found", status_code=404)
+
+    resumes = db.query(models.Resume).filter(
+        models.Resume.batch_id == batch.id,
+        models.Resume.user_id == user_id
+    ).all()
+    items = [(r, job_title(json.loads(r.input_json).get("job_desc", ""))) for r in resumes]
+
+    return templates.TemplateResponse("batch_detail.html", {
+        "request": request,
+        "batch": batch,
+        "progress": batch_progress(batch),
+        "items": items,
+        "title": f"批量任务 Batch #{batch.id}"
+    })
+
+@router.get("/resume/batch/{batch_id}/status")
+def batch_status(request: Request, batch_id: int, db: Session = Depends(get_db)):
+    """
+    批量任务进度 (JSON)
+    Batch Progress (JSON)
+    """
+    user_id = require_login(request)
+    if not user_id:
+        return JSONResponse({"error": "login required"}, status_code=401)
+
+    batch = _get_user_batch(db, user_id, batch_id)
+    if not batch:
+        return JSONResponse({"error": "batch not found"}, status_code=404)
+    return JSONResponse(batch_progress(batch))
+
+@router.get("/resume/{resume_id}", response_class=HTMLResponse)
 def view_resume(request: Request, resume_id: int, db: Session = Depends(get_db)):
     """
     查看简历详情
@@ -291,7 +596,13 @@ def view_resume(request: Request, resume_id: int, db: Session = Depends(get_db))
     if not user_id:
         return RedirectResponse(url="/login", status_code=302)
 
-    resume = db.query(models.Resume).filter(
+    # 大字段延迟加载：命中缓存 / 304 时无需读取
+    # Large columns are deferred: not needed for a cache hit or a 304
+    resume = db.query(models.Resume).options(
+        defer(models.Resume.input_json),
+        defer(models.Resume.output_json),
+        defer(models.Resume.ai_usage),
+    ).filter(
         models.Resume.id == resume_id, 
         models.Resume.user_id == user_id
     ).first()
@@ -299,52 +610,45 @@ def view_resume(request: Request, resume_id: int, db: Session = Depends(get_db))
     if not resume:
         return Response("Resume not found", status_code=404)
 
-    # 解析 JSON
-    # Parse JSON
-    data = json.loads(resume.output_json)
-    usage = json.loads(resume.ai_usage) if resume.ai_usage else {}
+    # 简历保存后不再变化：内容未变时直接返回 304
+    # Saved resumes are immutable: answer 304 while the content is unchanged
+    etag = preview_etag(resume)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=cache_headers)
 
     return templates.TemplateResponse("resume.html", {
         "request": request, 
-        "resume": data,
-        "usage": usage,
+        "preview_html": render_preview(resume),
         "resume_id": resume.id,
         "title": "简历预览 Resume Preview"
-    })
+    }, headers=cache_headers)
 
-@app.get("/resume/{resume_id}/pdf")
+@router.get("/resume/{resume_id}/pdf")
 def download_pdf(request: Request, resume_id: int, db: Session = Depends(get_db)):
     """
-    导出 PDF
-    Export PDF
+    导出 PDF：优先返回后台预渲染的结果，未命中时当场渲染
+    Export PDF: serve the background pre-render, rendering on demand on a miss
     """
     user_id = require_login(request)
     if not user_id:
         return RedirectResponse(url="/login", status_code=302)
 
-    resume = db.query(models.Resume).filter(
-        models.Resume.id == resume_id, 
+    # 大字段延迟加载：命中预渲染时无需读取 output_json
+    # Large columns are deferred: a pre-render hit never reads output_json
+    resume = db.query(models.Resume).options(
+        defer(models.Resume.input_json),
+        defer(models.Resume.output_json),
+        defer(models.Resume.ai_usage),
+    ).filter(
+        models.Resume.id == resume_id,
         models.Resume.user_id == user_id
     ).first()
-    
+
     if not resume:
         return Response("Resume not found", status_code=404)
 
-    data_dict = json.loads(resume.output_json)
-    # 转换为 Schema
-    try:
-        resume_schema = ResumeOut(**data_dict)
-    except Exception:
-        # 异常处理：返回空结构
-        resume_schema = ResumeOut(
-            personal_info={"name": "Error", "email": ""},
-            summary="Data validation error",
-            education=[],
-            work_experience=[],
-            skills=[]
-        )
-
-    pdf_bytes = build_resume_pdf(resume_schema)
+    pdf_bytes = pdf_for_resume(db, resume)
     
     return Response(
         content=pdf_bytes, 
@@ -352,35 +656,169 @@ def download_pdf(request: Request, resume_id: int, db: Session = Depends(get_db)
         headers={"Content-Disposition": f"attachment; filename=resume_{resume_id}.pdf"}
     )
 
-@app.get("/test-openai", response_class=HTMLResponse)
+def require_admin(request: Request, db: Session) -> bool:
+    """
+    检查当前用户是否为管理员 (ADMIN_EMAILS)
+    Check whether the logged-in user is listed in ADMIN_EMAILS
+    """
+    user_id = require_login(request)
+    if not user_id:
+        return False
+    admins = {email.strip().lower() for email in settings.admin_emails.split(",") if email.strip()}
+    user = db.get(models.User, user_id)
+    return user is not None and user.email.lower() in admins
+
+@router.get("/admin/profiles", response_class=HTMLResponse)
+def admin_profiles(request: Request, db: Session = Depends(get_db)):
+    """
+    慢请求 profile 列表 (仅管理员)
+    Slow-request profile list (admins only)
+    """
+    if not require_admin(request, db):
+        return Response("Not found", status_code=404)
+    return templates.TemplateResponse("admin_profiles.html", {
+        "request": request,
+        "title": "性能分析 Profiles",
+        "profiles": profile_store.list(),
+        "enabled": profiling_enabled(),
+        "slow_ms": settings.profiling_slow_ms,
+    })
+
+@router.get("/admin/profiles/{profile_id}", response_class=HTMLResponse)
+def admin_profile_detail(request: Request, profile_id: str, format: str = "html", db: Session = Depends(get_db)):
+    """
+    单个 profile：分阶段耗时与采样调用栈 (?format=json 返回原始数据)
+    One profile: phase breakdown and sampled stacks (?format=json for the raw data)
+    """
+    if not require_admin(request, db):
+        return Response("Not found", status_code=404)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return Response("Profile not found", status_code=404)
+    if format == "json":
+        return JSONResponse(profile)
+    return templates.TemplateResponse("admin_profile.html", {
+        "request": request,
+        "title": f"Profile {profile_id}",
+        "profile": profile,
+    })
+
+@router.get("/metrics/admission")
+def admission_metrics_endpoint(request: Request):
+    """
+    准入控制指标 (并发、排队时间、拒绝次数)
+    Admission Control Metrics (concurrency, queue time, rejections)
+    """
+    if not require_login(request):
+        return JSONResponse({"error": "login required"}, status_code=401)
+    return JSONResponse(admission_metrics())
+
+@router.get("/test-openai", response_class=HTMLResponse)
 def test_openai_page(request: Request):
     """
-    OpenAI 测试页面
-    Test OpenAI Page
+    OpenAI 状态页面：直接展示后台探测的最新结果，不发起请求
+    OpenAI status page: shows the latest background probe results without calling upstream
     """
     if not require_login(request):
         return RedirectResponse(url="/login", status_code=302)
-        
+
     return templates.TemplateResponse("test_api.html", {
-        "request": request, 
+        "request": request,
         "title": "测试 Test OpenAI API",
+        "health": openai_prober.snapshot(),
         "model_name": settings.openai_model
     })
 
-@app.post("/test-openai-run", response_class=HTMLResponse)
+@router.post("/test-openai-run", response_class=HTMLResponse)
 def test_openai_run(request: Request):
     """
-    执行 OpenAI 连接测试
-    Execute OpenAI Connection Test
+    立即重新探测 (最近一次探测足够新时直接复用结果)
+    Re-probe now (reuses the latest sample if it is recent enough)
     """
     if not require_login(request):
         return RedirectResponse(url="/login", status_code=302)
-    
-    result = test_api_connection()
-    
+
+    openai_prober.probe_if_stale()
+
     return templates.TemplateResponse("test_api.html", {
-        "request": request, 
+        "request": request,
         "title": "测试结果 Test Result",
-        "result": result,
+        "health": openai_prober.snapshot(),
         "model_name": settings.openai_model
     })
+
+@router.get("/health/openai")
+def openai_health(request: Request):
+    """
+    OpenAI 健康状态 (JSON)：滚动窗口内的延迟与错误率；错误详情仅登录用户可见
+    OpenAI health (JSON): rolling-window latency and error rate; error details for logged-in users only
+    """
+    return JSONResponse(openai_prober.snapshot(include_error=bool(require_login(request))))
+
+@router.get("/readyz")
+def readyz(request: Request):
+    """
+    就绪探针：预热完成前返回 503
+    Readiness Probe: 503 until warm-up has finished
+    """
+    state = request.app.state
+    ready = getattr(state, "ready", False)
+    return JSONResponse({
+        "ready": ready,
+        "init_ms": getattr(state, "init_ms", None),
+        "startup_ms": getattr(state, "startup_ms", None),
+        "warmup_ms": getattr(state, "warmup", {}),
+        "error": getattr(state, "warmup_error", None),
+    }, status_code=200 if ready else 503)
+
+def create_app() -> FastAPI:
+    """
+    应用工厂：import 时不做建表、不创建客户端，一切在 lifespan 中完成
+    App factory: nothing touches the DB or creates clients at import time; that happens in the lifespan.
+    Run with `uvicorn app.main:app` or `uvicorn --factory app.main:create_app`.
+    """
+    app = FastAPI(title="Resume Builder", lifespan=lifespan)
+
+    # 准入控制中间件 (先添加 = 位于 Session 中间件内层，可读取 user_id)
+    # Admission control middleware (added first = inside SessionMiddleware, so user_id is available)
+    if settings.admission_enabled:
+        app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+    # 配置 Session 中间件
+    # Session Middleware Configuration
+    app.add_middleware(
+        SessionMiddleware,
+        secret_key=settings.session_secret,
+        session_cookie="resume_builder_session",
+        same_site="lax",
+        https_only=False,  # 生产环境请设为 True
+    )
+
+    # 请求性能分析 (按需开启；位于 Session 外层，耗时包含准入排队)
+    # Request profiling (opt-in; outside SessionMiddleware so admission queueing is included)
+    if profiling_enabled():
+        instrument_engine(engine)
+        app.add_middleware(ProfilingMiddleware)
+
+    # 响应压缩 (最外层)：安装了 brotli-asgi 时优先 br，否则 gzip
+    # Response compression (outermost): brotli when brotli-asgi is installed, gzip otherwise
+    try:
+        from brotli_asgi import BrotliMiddleware
+    except ImportError:
+        app.add_middleware(GZipMiddleware, minimum_size=settings.compression_min_size, compresslevel=settings.gzip_level)
+    else:
+        app.add_middleware(
+            BrotliMiddleware,
+            minimum_size=settings.compression_min_size,
+            quality=settings.brotli_quality,
+            gzip_fallback=True,
+        )
+
+    # 挂载静态文件 (模板环境见 core/templating.py)
+    # Mount static files (the shared template environment lives in core/templating.py)
+    app.mount("/static", FingerprintedStaticFiles(directory=str(STATIC_DIR)), name="static")
+
+    app.include_router(router)
+    return app
+
+app = create_app()
@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..core import models
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..core.schemas import ResumeOut
+from .openai_client import (
+    build_profile_content,
+    build_user_content,
+    generate_tailored_resume,
+    get_client,
+    load_system_prompt,
+    response_format_for,
+)
+from .resumes import create_resume
+
+# 个人资料中参与 Prompt 构建的字段
+# Profile fields that go into the prompt
+PROFILE_FIELDS = (
+    "name", "email", "phone", "location", "linkedin", "github", "website",
+    "headline", "skills", "experience_text", "education_text", "free_text", "language",
+)
+
+# 表单中 JD 之间的分隔行
+# Separator line between job descriptions in the form
+JOB_SEPARATOR = "---"
+
+def split_job_descs(text: str) -> List[str]:
+    """
+    按分隔行 (---) 拆分多个 JD，忽略空白条目
+    Split the job description textarea on separator lines, dropping empty entries
+    """
+    jobs: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if line.strip() == JOB_SEPARATOR:
+            jobs.append("\n".join(current).strip())
+            current = []
+        else:
+            current.append(line)
+    jobs.append("\n".join(current).strip())
+    return [job for job in jobs if job]
+
+def job_title(job_desc: str, limit: int = 60) -> str:
+    """
+    取 JD 第一行作为标题 (用于进度页展示)
+    First line of a job description, used as its label on the progress page
+    """
+    first = job_desc.strip().splitlines()[0] if job_desc.strip() else ""
+    return first if len(first) <= limit else first[:limit] + "…"
+
+def _input_data(profile: Dict[str, Any], job_desc: str) -> Dict[str, Any]:
+    """
+    与单个生成接口一致的 input_json 结构
+    Same input_json shape as the single-resume endpoint
+    """
+    return {
+        "name": profile["name"],
+        "email": profile["email"],
+        "phone": profile["phone"],
+        "headline": profile["headline"],
+        "skills": profile["skills"],
+        "experience_text": profile["experience_text"],
+        "education_text": profile["education_text"],
+        "free_text": profile["free_text"],
+        "job_desc": job_desc,
+        "language": profile["language"],
+    }
+
+def create_batch_job(
+    db: Session,
+    *,
+    user_id: int,
+    profile: Dict[str, Any],
+    job_descs: List[str],
+    model_name: str,
+    generation_mode: str,
+    use_provider_batch: bool,
+) -> models.BatchJob:
+    """
+    创建批量任务记录 (实际生成在后台执行)
+    Create the batch job row; generation runs in the background
+    """
+    batch = models.BatchJob(
+        user_id=user_id,
+        mode="provider" if use_provider_batch else "online",
+        total=len(job_descs),
+        input_json=json.dumps({
+            "profile": {key: profile.get(key, "") for key in PROFILE_FIELDS},
+            "job_descs": job_descs,
+            "model": model_name,
+            "generation_mode": generation_mode,
+        }, ensure_ascii=False),
+    )
+    db.add(batch)
+    db.commit()
+    db.refresh(batch)
+    return batch
+
+def run_batch(batch_id: int) -> None:
+    """
+    后台任务入口：按模式执行批量任务
+    Background task entry point: run the batch in its configured mode
+    """
+    db = SessionLocal()
+    try:
+        batch = db.get(models.BatchJob, batch_id)
+        if batch is None or batch.status != "pending":
+            return
+        if batch.mode == "online":
+            # 条件更新抢占执行权：请求的后台任务与恢复线程不会重复执行同一任务
+            # Claim with a conditional update so the request's background task and a
+            # recovery thread never run the same batch twice
+            claimed = db.query(models.BatchJob).filter(
+                models.BatchJob.id == batch.id,
+                models.BatchJob.status == "pending",
+            ).update({"status": "running", "updated_at": dt.datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return
+            db.refresh(batch)
+        try:
+            if batch.mode == "provider":
+                _submit_provider_batch(db, batch)
+            else:
+                _run_online_batch(db, batch)
+        except Exception as e:
+            print(f"Batch {batch_id} failed: {e}")
+            db.rollback()
+            batch.status = "failed"
+            batch.error = str(e)
+            db.commit()
+    finally:
+        db.close()
+
+def _run_online_batch(db: Session, batch: models.BatchJob) -> None:
+    """
+    实时模式：有界并发调用，个人资料预处理只做一次
+    Online mode: bounded concurrent calls sharing one profile pre-processing step
+    """
+    payload = json.loads(batch.input_json)
+    profile = payload["profile"]
+    job_descs: List[str] = payload["job_descs"]
+
+    # 恢复执行时跳过已保存简历的 JD (重复的 JD 按次数计)
+    # When resuming, skip postings that already have a saved resume (duplicates counted)
+    saved = Counter(
+        json.loads(input_json).get("job_desc", "")
+        for (input_json,) in db.query(models.Resume.input_json).filter(models.Resume.batch_id == batch.id)
+    )
+    remaining: List[str] = []
+    for job_desc in job_descs:
+        if saved[job_desc]:
+            saved[job_desc] -= 1
+        else:
+            remaining.append(job_desc)
+    batch.completed = len(job_descs) - len(remaining)
+    batch.failed = 0
+    db.commit()
+
+    # 共享预处理：系统 Prompt 与个人资料块只构建一次
+    # Shared pre-processing: system prompt and profile block are built once
+    system_prompt = load_system_prompt()
+    profile_content = build_profile_content(**profile)
+
+    with ThreadPoolExecutor(max_workers=max(1, settings.batch_max_concurrency)) as pool:
+        futures = {
+            pool.submit(
+                generate_tailored_resume,
+                profile_content, job_desc,
+                name=profile["name"], email=profile["email"], phone=profile["phone"],
+                language=profile["language"], model_name=payload["model"],
+                mode=payload["generation_mode"] or None, system_prompt=system_prompt,
+                raise_on_failure=True,
+            ): job_desc
+            for job_desc in remaining
+        }
+        # 结果在当前线程落库，保证 Session 只被一个线程使用；
+        # 长时间没有结果时也定期刷新 updated_at，避免运行中的任务被当作已中断
+        # Results are saved on this thread so the Session is never shared. updated_at is
+        # refreshed periodically even without results, so a live batch never looks abandoned.
+        heartbeat = max(1.0, settings.batch_stale_seconds / 4)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=heartbeat, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_desc = futures[future]
+                # 拒绝与错误计为失败，不保存占位简历
+                # Refusals and errors count as failed; no placeholder resume is saved
+                try:
+                    resume_out, usage = future.result()
+                except Exception as e:
+                    print(f"Batch {batch.id} item failed: {e}")
+                    batch.failed += 1
+                else:
+                    create_resume(
+                        db, user_id=batch.user_id, input_data=_input_data(profile, job_desc),
+                        resume_out=resume_out, ai_usage=usage, batch_id=batch.id, commit=False,
+                    )
+                    batch.completed += 1
+            if not done:
+                batch.updated_at = dt.datetime.utcnow()
+            db.commit()
+
+    batch.status = "completed" if batch.completed else "failed"
+    db.commit()
+
+# ---------------------------------------------------------------------------
+# OpenAI Batch API (异步、低价，24 小时内完成)
+# OpenAI Batch API: asynchronous and cheaper, finishes within 24 hours.
+# 仅支持单次调用模式 (fanout 的多次调用无法在同一请求行中表达)。
+# Single-call mode only: a fan-out request cannot be expressed as one batch line.
+# ---------------------------------------------------------------------------
+
+def _submit_provider_batch(db: Session, batch: models.BatchJob) -> None:
+    """
+    上传 JSONL 请求文件并创建 Batch
+    Upload the JSONL request file and create the provider batch
+    """
+    payload = json.loads(batch.input_json)
+    profile = payload["profile"]
+    model = payload["model"] or settings.openai_model
+
+    system_prompt = load_system_prompt()
+    profile_content = build_profile_content(**profile)
+    response_format = response_format_for(ResumeOut)
+
+    lines = []
+    for index, job_desc in enumerate(payload["job_descs"]):
+        lines.append(json.dumps({
+            "custom_id": f"{batch.id}-{index}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": build_user_content(profile_content, job_desc)},
+                ],
+                "response_format": response_format,
+            },
+        }, ensure_ascii=False))
+
+    client = get_client()
+    upload = client.files.create(
+        file=(f"resume_batch_{batch.id}.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    remote = client.batches.create(
+        input_file_id=upload.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    batch.provider_batch_id = remote.id
+    batch.status = "submitted"
+    db.commit()
+
+def sync_provider_batch(db: Session, batch: models.BatchJob) -> None:
+    """
+    查询 Batch 状态；完成后下载结果并保存为 Resume (轮询进度时调用)
+    Poll the provider batch; once finished, import its results as Resume rows
+    """
+    if batch.mode != "provider" or batch.status != "submitted" or not batch.provider_batch_id:
+        return
+
+    client = get_client()
+    try:
+        remote = client.batches.retrieve(batch.provider_batch_id)
+    except Exception as e:
+        print(f"Batch {batch.id} poll failed: {e}")
+        return
+
+    if remote.status in ("failed", "expired", "cancelled"):
+        batch.status = "failed"
+        batch.error = f"Provider batch {remote.status}"
+        db.commit()
+        return
+
+    if remote.status != "completed":
+        counts = remote.request_counts
+        if counts:
+            batch.completed, batch.failed = counts.completed, counts.failed
+            db.commit()
+        return
+
+    # 条件更新抢占导入权，避免并发轮询重复导入
+    # Claim the import with a conditional update so concurrent polls don't import twice
+    claimed = db.query(models.BatchJob).filter(
+        models.BatchJob.id == batch.id,
+        models.BatchJob.status == "submitted",
+    ).update({"status": "importing"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return
+    db.refresh(batch)
+
+    # 下载与导入在同一事务中完成：任何失败都回滚已写入的简历并恢复为 submitted，下次轮询重试
+    # Download and import in one transaction: on any failure the written resumes are rolled
+    # back and the batch returns to "submitted" so the next poll retries
+    try:
+        payload = json.loads(batch.input_json)
+        profile = payload["profile"]
+        job_descs: List[str] = payload["job_descs"]
+        completed = 0
+        output = client.files.content(remote.output_file_id).text if remote.output_file_id else ""
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                index = int(item["custom_id"].rsplit("-", 1)[1])
+                body = item["response"]["body"]
+                resume_out = ResumeOut.model_validate_json(body["choices"][0]["message"]["content"])
+            except Exception as e:
+                print(f"Batch {batch.id} result line skipped: {e}")
+                continue
+            create_resume(
+                db, user_id=batch.user_id, input_data=_input_data(profile, job_descs[index]),
+                resume_out=resume_out, ai_usage=body.get("usage") or {}, batch_id=batch.id, commit=False,
+            )
+            completed += 1
+
+        batch.completed = completed
+        batch.failed = batch.total - completed
+        batch.status = "completed" if completed else "failed"
+        batch.error = None
+        db.commit()
+    except Exception as e:
+        print(f"Batch {batch.id} import failed, will retry: {e}")
+        db.rollback()
+        batch.status = "submitted"
+        batch.error = f"Import failed, retrying: {e}"
+        db.commit()
+
+# ---------------------------------------------------------------------------
+# 中断恢复：进程重启或崩溃后，在线任务不再有后台线程驱动，导入中的任务也不会被轮询处理
+# Recovery: after a restart or crash nothing drives a pending/running online batch any
+# more, and an "importing" provider batch is skipped by every poll.
+# ---------------------------------------------------------------------------
+
+def _stale_filter():
+    cutoff = dt.datetime.utcnow() - dt.timedelta(seconds=settings.batch_stale_seconds)
+    return or_(models.BatchJob.updated_at.is_(None), models.BatchJob.updated_at < cutoff)
+
+def recover_batch_if_stale(db: Session, batch: models.BatchJob) -> None:
+    """
+    恢复已中断的任务：在线任务重新排队 (跳过已保存的 JD)，导入中的 provider 任务退回 submitted，
+    尚未提交的 provider 任务标记为失败 (无法确认是否已上传，避免重复提交计费)
+    Recover an abandoned batch: online batches are requeued (skipping saved postings),
+    "importing" provider batches go back to "submitted" for the next poll, and provider
+    batches interrupted before submission are failed (they may already have been uploaded,
+    so resubmitting could bill twice)
+    """
+    if batch.status not in ("pending", "running", "importing"):
+        return
+    if batch.mode == "online":
+        values: Dict[str, Any] = {"status": "pending"}
+    elif batch.status == "importing":
+        values = {"status": "submitted", "error": "Import interrupted, retrying"}
+    elif batch.status == "pending":
+        values = {"status": "failed", "error": "Interrupted before submission to the provider; please resubmit"}
+    else:
+        return
+    # 条件更新：只有一个 worker / 轮询能恢复同一任务
+    # Conditional update so only one worker or poll recovers a given batch
+    claimed = db.query(models.BatchJob).filter(
+        models.BatchJob.id == batch.id,
+        models.BatchJob.status == batch.status,
+        _stale_filter(),
+    ).update({**values, "updated_at": dt.datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return
+    db.refresh(batch)
+    print(f"Batch {batch.id} was interrupted; now {batch.status}")
+    if batch.mode == "online":
+        threading.Thread(target=run_batch, args=(batch.id,), name=f"batch-{batch.id}", daemon=True).start()
+
+def recover_stale_batches() -> None:
+    """
+    启动时恢复所有已中断的任务 (在 lifespan 中执行)
+    Recover every abandoned batch at startup (run from the lifespan)
+    """
+    db = SessionLocal()
+    try:
+        batches = db.query(models.BatchJob).filter(
+            models.BatchJob.status.in_(("pending", "running", "importing")),
+            _stale_filter(),
+        ).all()
+        for batch in batches:
+            recover_batch_if_stale(db, batch)
+    finally:
+        db.close()
+
+def batch_progress(batch: models.BatchJob) -> Dict[str, Any]:
+    """
+    进度信息 (供 JSON 接口与进度页使用)
+    Progress summary for the JSON endpoint and the progress page
+    """
+    done = batch.completed + batch.failed
+    return {
+        "id": batch.id,
+        "status": batch.status,
+        "mode": batch.mode,
+        "total": batch.total,
+        "completed": batch.completed,
+        "failed": batch.failed,
+        "percent": int(done * 100 / batch.total) if batch.total else 100,
+        "finished": batch.status in ("completed", "failed"),
+        "error": batch.error,
+    }
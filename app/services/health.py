@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from ..core.config import settings
+from .openai_client import get_client
+
+class OpenAIHealthProber:
+    """
+    后台定期探测 OpenAI 可用性与延迟 (models.retrieve，不消耗 token)，保存滚动窗口
+    Periodically probes OpenAI availability and latency in the background with a
+    cheap models.retrieve call (no tokens) and keeps a rolling window of samples.
+    """
+    def __init__(self, interval: float, window: int, min_interval: float, timeout: float):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.timeout = timeout
+        # (检测时间, 延迟毫秒, 是否成功, 错误信息)
+        # (checked_at, latency_ms, ok, error)
+        self._samples: Deque[tuple[float, float, bool, str]] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def probe_once(self) -> None:
+        """
+        执行一次探测；并发调用时只有一个真正发出请求
+        Run one probe; concurrent callers share a single in-flight request
+        """
+        if not self._probe_lock.acquire(blocking=False):
+            # 已有探测进行中：等待其完成即可
+            # A probe is already running: just wait for it
+            with self._probe_lock:
+                return
+        try:
+            start = time.perf_counter()
+            ok, error = True, ""
+            try:
+                get_client().with_options(timeout=self.timeout, max_retries=0).models.retrieve(
+                    settings.openai_model
+                )
+            except Exception as e:
+                ok, error = False, str(e)
+            latency_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._samples.append((time.time(), latency_ms, ok, error))
+        finally:
+            self._probe_lock.release()
+
+    def probe_if_stale(self) -> None:
+        """
+        最近一次探测早于 min_interval 时才重新探测 (页面按钮使用，防止频繁点击)
+        Probe only when the latest sample is older than min_interval (used by the page button)
+        """
+        with self._lock:
+            last = self._samples[-1][0] if self._samples else 0.0
+        if time.time() - last >= self.min_interval:
+            self.probe_once()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.probe_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="openai-health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+
+    def snapshot(self, include_error: bool = True) -> Dict[str, Any]:
+        """
+        当前健康状态：up / degraded / down / unknown，附滚动窗口统计
+        Current health (up / degraded / down / unknown) with rolling-window statistics
+        """
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"status": "unknown", "model": settings.openai_model, "samples": 0}
+
+        checked_at, last_latency, last_ok, _ = samples[-1]
+        failures = [s for s in samples if not s[2]]
+        latencies = sorted(s[1] for s in samples if s[2])
+        error_rate = len(failures) / len(samples)
+
+        def pct(p: float) -> float | None:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None
+
+        if not last_ok:
+            status = "down"
+        elif error_rate > 0:
+            status = "degraded"
+        else:
+            status = "up"
+
+        result: Dict[str, Any] = {
+            "status": status,
+            "model": settings.openai_model,
+            "last_checked": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(checked_at)),
+            "last_ok": last_ok,
+            "last_latency_ms": round(last_latency, 1),
+            "p50_latency_ms": pct(0.50),
+            "p95_latency_ms": pct(0.95),
+            "error_rate": round(error_rate, 3),
+            "samples": len(samples),
+            "probe_interval_s": self.interval,
+        }
+        if include_error:
+            result["last_error"] = failures[-1][3] if failures else ""
+        return result
+
+openai_prober = OpenAIHealthProber(
+    interval=settings.health_probe_interval,
+    window=settings.health_probe_window,
+    min_interval=settings.health_probe_min_interval,
+    timeout=settings.health_probe_timeout,
+)
@@ -1,55 +1,144 @@
 from __future__ import annotations
 
-import json
-from typing import Any, Dict
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Type
 from pathlib import Path
 
-from openai import OpenAI
+from pydantic import BaseModel
+from ..core.admission import generation_slots
 from ..core.config import settings
-from ..core.schemas import ResumeOut
+from ..core.schemas import (
+    ResumeOut,
+    ProfileSection,
+    ExperienceSection,
+    ProjectsSection,
+    EducationSkillsSection,
+)
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # 加载 Prompt 文件
 PROMPT_PATH = Path(__file__).resolve().parent.parent / "prompts" / "resume_generator_v2.txt"
 
+# Prompt 缓存: (mtime_ns, 内容)；文件修改后自动重新读取
+# Prompt cache: (mtime_ns, text); re-read when the file changes
+_prompt_cache: tuple[int, str] | None = None
+
 def load_system_prompt() -> str:
-    """Read system prompt from file"""
+    """Read system prompt from file (cached until the file changes)"""
+    global _prompt_cache
     try:
-        return PROMPT_PATH.read_text(encoding="utf-8")
+        mtime = PROMPT_PATH.stat().st_mtime_ns
+        if _prompt_cache is None or _prompt_cache[0] != mtime:
+            _prompt_cache = (mtime, PROMPT_PATH.read_text(encoding="utf-8"))
+        return _prompt_cache[1]
     except Exception as e:
         print(f"Error loading prompt: {e}")
         # Fallback prompt if file missing
         return "You are a helpful resume assistant."
 
-# 初始化 OpenAI 客户端 (使用 core/config 中的配置)
-# Initialize OpenAI Client using core/config settings
-client = OpenAI(api_key=settings.openai_api_key)
+# OpenAI 客户端 (连同 SDK 的 import) 延迟到首次使用或预热时，避免拖慢启动
+# The OpenAI client (and the SDK import itself) is deferred to first use or warm-up
+_client: "OpenAI | None" = None
+_client_lock = threading.Lock()
 
-def test_api_connection() -> Dict[str, Any]:
+def build_client(**overrides: Any) -> "OpenAI":
     """
-    测试 OpenAI API 连接
-    Test OpenAI API Connection
+    创建 OpenAI 客户端：可配置的连接池、keep-alive，安装了 h2 时启用 HTTP/2
+    Build an OpenAI client with a tuned connection pool and keep-alive; HTTP/2 when h2 is installed
     """
-    try:
-        response = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {"role": "user", "content": "Say 'Health check passed' if you can hear me."}
-            ],
-            max_tokens=20
-        )
-        return {
-            "success": True, 
-            "message": response.choices[0].message.content,
-            "model": response.model,
-            "usage": response.usage.model_dump()
-        }
-    except Exception as e:
-        return {
-            "success": False, 
-            "error": str(e)
-        }
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
 
-def generate_resume(
+    http2 = settings.openai_http2 and importlib.util.find_spec("h2") is not None
+    if settings.openai_http2 and not http2:
+        # h2 应随 requirements.txt 安装；缺失时明确提示，而不是静默回退到 HTTP/1.1
+        # h2 ships with requirements.txt; say so instead of silently falling back to HTTP/1.1
+        print("OPENAI_HTTP2 is enabled but h2 is not installed; using HTTP/1.1 (pip install h2)")
+    http_client = DefaultHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+        ),
+    )
+    return OpenAI(api_key=settings.openai_api_key, http_client=http_client, **overrides)
+
+def get_client() -> "OpenAI":
+    """
+    获取进程内共享的 OpenAI 客户端 (所有请求、批量任务与健康探测共用同一连接池)
+    Get the process-wide OpenAI client (generation, batches and the health probe share one pool)
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_client()
+    return _client
+
+def set_client(client: Any) -> None:
+    """
+    替换客户端 (用于基准测试的桩后端)
+    Replace the client (used by benchmarks to install a stubbed backend)
+    """
+    global _client
+    _client = client
+
+@lru_cache(maxsize=None)
+def response_format_for(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Pydantic 模型 -> 严格 JSON Schema 的 response_format (每个模型只构建一次)
+    Strict JSON-schema response_format for a Pydantic model, built once per model
+    """
+    # 公开的 pydantic_function_tool 生成与 beta.parse 相同的严格 Schema (不依赖 openai.lib 私有模块)
+    # The public pydantic_function_tool builds the same strict schema beta.parse uses,
+    # without importing private openai.lib modules
+    from openai import pydantic_function_tool
+
+    function = pydantic_function_tool(schema)["function"]
+    return {
+        "type": "json_schema",
+        "json_schema": {"schema": function["parameters"], "name": function["name"], "strict": True},
+    }
+
+def warm_response_formats() -> None:
+    """
+    预先构建所有结构化输出的 Schema (预热时调用)
+    Pre-build every structured-output schema (called from warm-up)
+    """
+    for schema in (ResumeOut, *(section for section, _ in FANOUT_SECTIONS.values())):
+        response_format_for(schema)
+
+def _structured_completion(
+    model: str,
+    messages: List[Dict[str, str]],
+    schema: Type[BaseModel],
+) -> tuple[BaseModel | None, str | None, dict]:
+    """
+    使用预构建的 response_format 调用 chat.completions.create 并校验输出
+    Call chat.completions.create with the cached response_format and validate the output
+    Returns: (parsed or None, refusal, usage_dict)
+    """
+    completion = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format=response_format_for(schema),
+    )
+    choice = completion.choices[0]
+    usage = completion.usage.model_dump() if completion.usage else {}
+    if choice.finish_reason == "length":
+        raise ValueError("Structured output truncated (finish_reason=length)")
+    message = choice.message
+    if message.refusal or not message.content:
+        return None, message.refusal, usage
+    return schema.model_validate_json(message.content), None, usage
+
+def build_profile_content(
     name: str,
     email: str,
     phone: str,
@@ -62,21 +151,13 @@ def generate_resume(
     experience_text: str,
     education_text: str,
     free_text: str,
-    job_desc: str,
     language: str,
-    model_name: str = "gpt-4o-2024-08-06"
-) -> tuple[ResumeOut, dict]:
+) -> str:
     """
-    调用 OpenAI API 生成简历数据结构
-    Call OpenAI API to generate resume data structure
-    Returns: (ResumeOut, usage_dict)
+    构建用户输入 Prompt 中与岗位无关的部分 (批量生成时只需构建一次)
+    Build the job-independent part of the user prompt (built once per batch)
     """
-    
-    system_prompt = load_system_prompt()
-
-    # 构建用户输入 Prompt
-    # Build User Prompt
-    user_content = f"""
+    return f"""
     # Prefer Output Language
     {language}
 
@@ -101,45 +182,336 @@ def generate_resume(
 
     # Additional / Free Text Input
     {free_text}
+"""
 
+def build_user_content(profile_content: str, job_desc: str) -> str:
+    """
+    拼接个人资料与目标岗位 JD
+    Combine the profile block with the target job description
+    """
+    return f"""{profile_content}
     # Target Job JD
     {job_desc}
     """
 
+class GenerationFailed(Exception):
+    """
+    生成失败 (模型拒绝、输出无效或 API 错误)；usage 为已消耗的 token 统计
+    Generation failed (refusal, invalid output or API error); usage holds the tokens already spent
+    """
+    def __init__(self, message: str, usage: Dict[str, Any] | None = None):
+        super().__init__(message)
+        self.usage = usage or {}
+
+def _fallback_resume(name: str, email: str, phone: str, summary: str) -> ResumeOut:
+    """
+    生成失败时返回的占位简历
+    Placeholder resume returned when generation fails
+    """
+    return ResumeOut(
+        contact={"name": name, "email": email, "phone": phone},
+        summary=summary,
+        education=[], experience=[], skills=[]
+    )
+
+def _merge_usage(usages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    合并多次调用的 usage (数值字段逐项相加)
+    Merge usage dicts of several calls (numeric fields are summed)
+    """
+    merged: Dict[str, Any] = {}
+    for usage in usages:
+        for key, value in (usage or {}).items():
+            if isinstance(value, dict):
+                merged[key] = _merge_usage([merged.get(key) or {}, value])
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = (merged.get(key) or 0) + value
+            elif key not in merged:
+                merged[key] = value
+    return merged
+
+def generate_resume(
+    name: str,
+    email: str,
+    phone: str,
+    location: str,
+    linkedin: str,
+    github: str,
+    website: str,
+    headline: str,
+    skills: str,
+    experience_text: str,
+    education_text: str,
+    free_text: str,
+    job_desc: str,
+    language: str,
+    model_name: str = "gpt-4o-2024-08-06",
+    mode: str | None = None,
+) -> tuple[ResumeOut, dict]:
+    """
+    调用 OpenAI API 生成简历数据结构
+    Call OpenAI API to generate resume data structure
+    mode: "single" (默认, 一次调用) 或 "fanout" (分段并发调用后合并)
+    Returns: (ResumeOut, usage_dict)
+    """
+    profile_content = build_profile_content(
+        name=name, email=email, phone=phone, location=location,
+        linkedin=linkedin, github=github, website=website, headline=headline,
+        skills=skills, experience_text=experience_text, education_text=education_text,
+        free_text=free_text, language=language,
+    )
+    return generate_tailored_resume(
+        profile_content, job_desc,
+        name=name, email=email, phone=phone, language=language,
+        model_name=model_name, mode=mode,
+    )
+
+def generate_tailored_resume(
+    profile_content: str,
+    job_desc: str,
+    *,
+    name: str,
+    email: str,
+    phone: str,
+    language: str,
+    model_name: str = "gpt-4o-2024-08-06",
+    mode: str | None = None,
+    system_prompt: str | None = None,
+    raise_on_failure: bool = False,
+) -> tuple[ResumeOut, dict]:
+    """
+    基于预先构建的个人资料，针对单个 JD 生成简历
+    Generate a resume for one job description from a pre-built profile block
+    raise_on_failure: 失败时抛出 GenerationFailed，而不是返回占位简历 (批量任务使用)
+    raise_on_failure: raise GenerationFailed instead of returning a placeholder resume (used by batches)
+    Returns: (ResumeOut, usage_dict)
+    """
+    if system_prompt is None:
+        system_prompt = load_system_prompt()
+
+    user_content = build_user_content(profile_content, job_desc)
 
-    # 调用 ChatCompletion (使用 tool_calls/function_calling 的 Structured Outputs 或者是 json_object)
-    # 本例使用最新的 beta.parse (Structured Outputs)
     # Use selected model or fallback to default
     target_model = model_name if model_name else settings.openai_model
-    try:
-        completion = client.beta.chat.completions.parse(
-            model=target_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
-            response_format=ResumeOut,
-        )
-        
-        message = completion.choices[0].message
-        usage = completion.usage.model_dump() if completion.usage else {}
-        
-        if message.parsed:
-            return message.parsed, usage
-        else:
-            # Fallback (Refusal)
-            print("Refusal:", message.refusal)
-            return ResumeOut(
-                contact={"name": name, "email": email, "phone": phone},
-                summary="AI无法生成简历，请检查输入。(AI failed to generate resume)",
-                education=[], experience=[], skills=[]
-            ), usage
 
-    except Exception as e:
-        print(f"OpenAI API Error: {e}")
-        # 返回空对象以防崩溃
-        return ResumeOut(
-            contact={"name": name, "email": email, "phone": phone},
-            summary=f"Error generating resume: {e}",
-            education=[], experience=[], skills=[]
-        ), {}
+    # 交互式生成与批量任务共享同一份模型调用并发预算 (见 admission.generation_slots)
+    # Interactive and batch generations draw on one model-call budget (see admission.generation_slots)
+    with generation_slots:
+        if (mode or settings.generation_mode) == "fanout":
+            return _generate_resume_fanout(
+                system_prompt, user_content, target_model,
+                name=name, email=email, phone=phone, language=language,
+                raise_on_failure=raise_on_failure,
+            )
+
+        # Structured Outputs：response_format 为预构建的 ResumeOut 严格 Schema
+        # Structured Outputs with the pre-built strict ResumeOut schema
+        try:
+            parsed, refusal, usage = _structured_completion(
+                target_model,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                ResumeOut,
+            )
+        except Exception as e:
+            print(f"OpenAI API Error: {e}")
+            if raise_on_failure:
+                raise GenerationFailed(f"OpenAI API Error: {e}") from e
+            # 返回空对象以防崩溃
+            return _fallback_resume(name, email, phone, f"Error generating resume: {e}"), {}
+
+        if parsed:
+            return parsed, usage
+        # Fallback (Refusal)
+        print("Refusal:", refusal)
+        if raise_on_failure:
+            raise GenerationFailed(f"Refusal: {refusal}", usage)
+        return _fallback_resume(
+            name, email, phone, "AI无法生成简历，请检查输入。(AI failed to generate resume)"
+        ), usage
+
+# ---------------------------------------------------------------------------
+# 并行分段生成 (fan-out)
+# Fan-out generation: one structured call per section, run concurrently.
+# 单次调用的延迟主要受输出 token 数限制，拆成多个较短的输出可以并行生成。
+# A single call is bounded by output-token speed; shorter per-section outputs
+# are generated in parallel and merged into one ResumeOut.
+# ---------------------------------------------------------------------------
+
+# 分段名 -> (分段模式, 该分段负责的字段说明)
+# Section key -> (section schema, description of the fields it owns)
+FANOUT_SECTIONS: Dict[str, tuple[Type[BaseModel], str]] = {
+    "profile": (ProfileSection, "language, contact, headline, summary"),
+    "experience": (ExperienceSection, "experience"),
+    "projects": (ProjectsSection, "projects"),
+    "education_skills": (EducationSkillsSection, "education, skills, certifications, additional"),
+}
+
+# 进程级并发上限：所有请求的分段调用共享
+# Process-wide limit on in-flight section calls, shared by all requests
+_fanout_semaphore = threading.BoundedSemaphore(max(1, settings.fanout_max_concurrency))
+
+def _section_prompt(system_prompt: str, fields: str) -> str:
+    """
+    在系统 Prompt 后追加分段说明
+    Append the per-section instruction to the system prompt
+    """
+    return (
+        f"{system_prompt}\n\n"
+        "# Section Mode / 分段模式\n"
+        f"本次调用只负责简历中的以下字段：{fields}。只输出这些字段，其余部分由其他调用生成。\n"
+        f"This call only produces these resume fields: {fields}. "
+        "Other parts of the resume are generated separately."
+    )
+
+def _generate_section(
+    key: str,
+    system_prompt: str,
+    user_content: str,
+    model: str,
+) -> tuple[BaseModel | None, dict]:
+    """
+    生成单个分段 (受信号量限制)
+    Generate a single section (bounded by the fan-out semaphore)
+    """
+    schema, fields = FANOUT_SECTIONS[key]
+    with _fanout_semaphore:
+        try:
+            parsed, refusal, usage = _structured_completion(
+                model,
+                [
+                    {"role": "system", "content": _section_prompt(system_prompt, fields)},
+                    {"role": "user", "content": user_content},
+                ],
+                schema,
+            )
+        except Exception as e:
+            print(f"OpenAI API Error ({key}): {e}")
+            return None, {}
+    if not parsed:
+        print(f"Refusal ({key}):", refusal)
+    return parsed, usage
+
+def _generate_sections(
+    keys: List[str],
+    system_prompt: str,
+    user_content: str,
+    model: str,
+) -> Dict[str, tuple[BaseModel | None, dict]]:
+    """
+    并发生成多个分段 / Generate several sections concurrently
+    """
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        futures = {
+            key: pool.submit(_generate_section, key, system_prompt, user_content, model)
+            for key in keys
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+def _consistency_pass(
+    system_prompt: str,
+    user_content: str,
+    model: str,
+    resume: ResumeOut,
+) -> tuple[ProfileSection | None, dict]:
+    """
+    根据合并后的正文重新生成 headline/summary
+    Re-derive headline/summary from the merged resume body
+    """
+    body = resume.model_dump_json(include={"experience", "projects", "education", "skills"})
+    with _fanout_semaphore:
+        try:
+            parsed, _, usage = _structured_completion(
+                model,
+                [
+                    {"role": "system", "content": _section_prompt(system_prompt, FANOUT_SECTIONS["profile"][1])},
+                    {"role": "user", "content": user_content},
+                    {"role": "user", "content": f"# Generated Resume Body (keep consistent with it)\n{body}"},
+                ],
+                ProfileSection,
+            )
+        except Exception as e:
+            print(f"OpenAI API Error (consistency): {e}")
+            return None, {}
+    return parsed, usage
+
+def _generate_resume_fanout(
+    system_prompt: str,
+    user_content: str,
+    model: str,
+    *,
+    name: str,
+    email: str,
+    phone: str,
+    language: str,
+    raise_on_failure: bool = False,
+) -> tuple[ResumeOut, dict]:
+    """
+    并发生成各分段并合并为 ResumeOut
+    Generate all sections concurrently and merge them into one ResumeOut
+    """
+    results = _generate_sections(list(FANOUT_SECTIONS), system_prompt, user_content, model)
+    usages = [usage for _, usage in results.values()]
+    calls = len(results)
+
+    # 失败或被拒绝的分段重试一次
+    # Sections that failed or were refused are retried once
+    failed = [key for key, (parsed, _) in results.items() if parsed is None]
+    if failed:
+        retried = _generate_sections(failed, system_prompt, user_content, model)
+        usages.extend(usage for _, usage in retried.values())
+        calls += len(retried)
+        results.update(retried)
+
+    sections = {key: parsed for key, (parsed, _) in results.items() if parsed is not None}
+    failed_sections = [key for key in FANOUT_SECTIONS if key not in sections]
+    if not sections:
+        if raise_on_failure:
+            raise GenerationFailed("No section could be generated", _merge_usage(usages))
+        return _fallback_resume(
+            name, email, phone, "AI无法生成简历，请检查输入。(AI failed to generate resume)"
+        ), _merge_usage(usages)
+    # profile 分段缺失时由一致性补全兜底；其他分段缺失则简历不完整，批量任务计为失败
+    # A missing profile section is covered by the consistency pass; any other missing
+    # section leaves the resume incomplete, so batches count the item as failed
+    if raise_on_failure and any(key != "profile" for key in failed_sections):
+        raise GenerationFailed(f"Sections failed: {', '.join(failed_sections)}", _merge_usage(usages))
+
+    merged: Dict[str, Any] = {}
+    for parsed in sections.values():
+        merged.update(parsed.model_dump())
+    # 表单选择的语言优先于 profile 分段输出的 language
+    # The language chosen in the form wins over the profile section's output
+    merged["language"] = language or merged.get("language") or "zh"
+    resume = ResumeOut.model_validate(merged)
+
+    # 本地规整：表单中非空的联系方式优先，技能去重
+    # Local normalization: non-empty form contact fields win, skills are de-duplicated
+    contact = resume.contact
+    contact.name = name or contact.name
+    contact.email = email or contact.email
+    contact.phone = phone or contact.phone
+    resume.skills = list(dict.fromkeys(s.strip() for s in resume.skills if s.strip()))
+
+    # 仅在 profile 分段缺失或没有 summary 时才做一次一致性补全
+    # Consistency pass only when the profile section is missing or has no summary
+    profile = sections.get("profile")
+    if profile is None or not profile.summary:
+        fixed, usage = _consistency_pass(system_prompt, user_content, model, resume)
+        usages.append(usage)
+        calls += 1
+        if fixed is not None:
+            resume.headline = resume.headline or fixed.headline
+            resume.summary = resume.summary or fixed.summary
+
+    usage = _merge_usage(usages)
+    usage["generation_mode"] = "fanout"
+    usage["calls"] = calls
+    if failed_sections:
+        # 交互模式下保留部分结果，但在 usage 中记录缺失的分段
+        # Interactive mode keeps the partial result but records the missing sections in usage
+        print(f"Fan-out sections failed after retry: {failed_sections}")
+        usage["failed_sections"] = failed_sections
+    return resume, usage
@@ -6,14 +6,21 @@ from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
 import os
+from functools import lru_cache
 
 from ..core.schemas import ResumeOut
 
+# 渲染器版本：修改 PDF 版式后递增，使已存储的预渲染结果失效
+# Renderer version: bump after changing the PDF layout so stored pre-renders are ignored
+PDF_RENDERER_VERSION = "3"
+
+@lru_cache(maxsize=None)
 def register_fonts():
     """
-    注册中文字体 (防止乱码)
-    Register Chinese Fonts
+    注册中文字体 (防止乱码)；只在首次调用 (或预热) 时加载字体文件
+    Register Chinese Fonts; the font file is loaded once, on first use or during warm-up
     注意：在非 Windows 环境可能需要调整字体路径或下载字体文件
     """
     # Windows 默认字体路径
@@ -27,6 +34,70 @@ def register_fonts():
     # Fallback
     return "Helvetica"
 
+# 页边距与正文宽度
+# Page margins and text width
+LEFT = 20 * mm
+RIGHT = 20 * mm
+TOP = 20 * mm
+BOTTOM = 20 * mm
+
+def wrap_text(text: str, font_name: str, size: float, max_width: float) -> list[str]:
+    """
+    按宽度换行：先按空白断行；中文等无空格文本仍超宽时按字符断行
+    Wrap text to max_width: break at whitespace first, then, for text without spaces
+    such as Chinese, at the last character that still fits
+    """
+    lines: list[str] = []
+    for part in simpleSplit(text, font_name, size, max_width) or [""]:
+        if pdfmetrics.stringWidth(part, font_name, size) <= max_width:
+            lines.append(part)
+            continue
+        current, width = "", 0.0
+        for char in part:
+            char_width = pdfmetrics.stringWidth(char, font_name, size)
+            if current and width + char_width > max_width:
+                lines.append(current)
+                current, width = "", 0.0
+            current += char
+            width += char_width
+        lines.append(current)
+    return lines
+
+class _PdfWriter:
+    """
+    简单的逐行排版：自动换行、自动分页
+    Minimal line-by-line layout with wrapping and page breaks
+    """
+    def __init__(self, c: canvas.Canvas, font_name: str):
+        self.c = c
+        self.font_name = font_name
+        self.width, self.height = A4
+        self.y = self.height - TOP
+
+    def _ensure(self, needed: float) -> None:
+        if self.y - needed < BOTTOM:
+            self.c.showPage()
+            self.y = self.height - TOP
+
+    def line(self, text: str, size: float = 10, indent: float = 0, leading: float = 5 * mm) -> None:
+        max_width = self.width - LEFT - RIGHT - indent
+        for part in wrap_text(text, self.font_name, size, max_width):
+            self._ensure(leading)
+            self.c.setFont(self.font_name, size)
+            self.c.drawString(LEFT + indent, self.y, part)
+            self.y -= leading
+
+    def section(self, title: str) -> None:
+        self.gap(3 * mm)
+        self._ensure(14 * mm)
+        self.line(title, size=12, leading=7 * mm)
+
+    def gap(self, amount: float) -> None:
+        self.y -= amount
+
+def _date_range(start: str, end: str) -> str:
+    return f" ({start} - {end})" if start or end else ""
+
 def build_resume_pdf(resume: ResumeOut) -> bytes:
     """
     生成简历 PDF 二进制流
@@ -34,87 +105,70 @@ def build_resume_pdf(resume: ResumeOut) -> bytes:
     """
     buffer = io.BytesIO()
     c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    
-    font_name = register_fonts()
-    
+    out = _PdfWriter(c, register_fonts())
+
     # 标题 (姓名)
-    c.setFont(font_name, 20)
-    name = resume.personal_info.get("name", "Unknown Name")
-    c.drawString(20 * mm, height - 20 * mm, name)
-    
+    contact = resume.contact
+    out.line(contact.name or "Resume", size=20, leading=10 * mm)
+
     # 联系方式
-    c.setFont(font_name, 10)
-    email = resume.personal_info.get("email", "")
-    phone = resume.personal_info.get("phone", "")
-    contact_info = f"Email: {email} | Phone: {phone}"
-    c.drawString(20 * mm, height - 30 * mm, contact_info)
-    
-    y = height - 45 * mm
-    
+    contact_parts = [contact.email, contact.phone, contact.location, contact.linkedin, contact.github, contact.website]
+    contact_info = " | ".join(part for part in contact_parts if part)
+    if contact_info:
+        out.line(contact_info)
+    if resume.headline:
+        out.line(resume.headline, size=11)
+
     # Summary
     if resume.summary:
-        c.setFont(font_name, 12)
-        c.drawString(20 * mm, y, "Summary / 个人总结")
-        y -= 6 * mm
-        c.setFont(font_name, 10)
-        # 简单换行处理
-        # Simple text wrapping
-        text_object = c.beginText(20 * mm, y)
-        text_object.setFont(font_name, 10)
-        # 这里只是演示，不支持长字符串自动换行。实际可用 reportlab.platypus
-        # Just demo, reportlab.platypus is better for wrapping
-        lines = resume.summary.split('\n')
-        for line in lines:
-            text_object.textLine(line)
-        c.drawText(text_object)
-        y -= (len(lines) * 5 * mm + 10 * mm)
+        out.section("Summary / 个人总结")
+        for paragraph in resume.summary.split("\n"):
+            out.line(paragraph)
 
     # 技能 Skills
     if resume.skills:
-        c.setFont(font_name, 12)
-        c.drawString(20 * mm, y, "Skills / 技能")
-        y -= 6 * mm
-        c.setFont(font_name, 10)
-        skills_str = ", ".join(resume.skills)
-        c.drawString(20 * mm, y, skills_str)
-        y -= 15 * mm
+        out.section("Skills / 技能")
+        out.line(", ".join(resume.skills))
 
     # 工作经历 Work Experience
-    if resume.work_experience:
-        c.setFont(font_name, 12)
-        c.drawString(20 * mm, y, "Work Experience / 工作经历")
-        y -= 8 * mm
-        
-        c.setFont(font_name, 10)
-        for job in resume.work_experience:
-            c.setFont(font_name, 10) # bold?
-            title_line = f"{job.role} at {job.company} ({job.start_date} - {job.end_date})"
-            c.drawString(20 * mm, y, title_line)
-            y -= 5 * mm
-            
-            # Details
-            for detail in job.description:
-                c.drawString(25 * mm, y, f"- {detail}")
-                y -= 5 * mm
-            y -= 5 * mm
+    if resume.experience:
+        out.section("Work Experience / 工作经历")
+        for job in resume.experience:
+            title = " at ".join(part for part in (job.role, job.company) if part)
+            out.line(f"{title}{_date_range(job.start, job.end)}", size=10.5)
+            for bullet in job.bullets:
+                out.line(f"- {bullet}", indent=5 * mm)
+            out.gap(2 * mm)
+
+    # 项目 Projects
+    if resume.projects:
+        out.section("Projects / 项目经历")
+        for project in resume.projects:
+            title = " - ".join(part for part in (project.name, project.role) if part)
+            out.line(f"{title}{_date_range(project.start, project.end)}", size=10.5)
+            if project.link:
+                out.line(project.link, indent=5 * mm)
+            for bullet in project.bullets:
+                out.line(f"- {bullet}", indent=5 * mm)
+            out.gap(2 * mm)
 
     # 教育 Education
     if resume.education:
-        # Check space
-        if y < 50 * mm:
-            c.showPage()
-            y = height - 20 * mm
-            c.setFont(font_name, 10)
-
-        c.setFont(font_name, 12)
-        c.drawString(20 * mm, y, "Education / 教育经历")
-        y -= 8 * mm
-        c.setFont(font_name, 10)
+        out.section("Education / 教育经历")
         for edu in resume.education:
-            line = f"{edu.degree} in {edu.field_of_study}, {edu.school} ({edu.year})"
-            c.drawString(20 * mm, y, line)
-            y -= 6 * mm
+            degree = " in ".join(part for part in (edu.degree, edu.major) if part)
+            line = ", ".join(part for part in (degree, edu.school) if part)
+            out.line(f"{line}{_date_range(edu.start, edu.end)}")
+
+    # 证书与其他 Certifications & Additional
+    if resume.certifications:
+        out.section("Certifications / 证书")
+        for item in resume.certifications:
+            out.line(f"- {item}")
+    if resume.additional:
+        out.section("Additional / 其他")
+        for item in resume.additional:
+            out.line(f"- {item}")
 
     c.save()
     buffer.seek(0)
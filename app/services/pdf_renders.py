@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core import models
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..core.profiling import phase
+from ..core.schemas import Contact, ResumeOut
+from .pdf_export import PDF_RENDERER_VERSION, build_resume_pdf
+from .resumes import load_resume_out
+
+# Session.info 中记录本事务新增简历 id 的键
+# Session.info key collecting ids of resumes inserted in the current transaction
+_PENDING_KEY = "pdf_prerender_ids"
+
+# 后台渲染线程池 (PDF 渲染是 CPU 密集型，默认单线程，避免挤占请求线程)
+# Background render pool (rendering is CPU-bound; one worker by default so requests aren't starved)
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+def render_resume_pdf(resume: models.Resume) -> bytes:
+    """
+    渲染简历 PDF
+    Render a saved resume's PDF
+    """
+    try:
+        resume_schema = load_resume_out(resume.output_json, resume.output_version)
+    except ValueError:
+        # 异常处理：返回空结构
+        resume_schema = ResumeOut(contact=Contact(name="Error"), summary="Data validation error")
+    with phase("pdf"):
+        return build_resume_pdf(resume_schema)
+
+def get_stored_pdf(db: Session, content_hash: str | None) -> bytes | None:
+    """
+    读取已存储的 PDF (当前渲染器版本)
+    Fetch a stored PDF rendered by the current renderer version
+    """
+    if not content_hash:
+        return None
+    row = db.get(models.PdfRender, (content_hash, PDF_RENDERER_VERSION))
+    return row.pdf if row else None
+
+def store_pdf(db: Session, content_hash: str, pdf: bytes) -> None:
+    """
+    保存 PDF；并发写入同一哈希时保留先写入的一份
+    Store a PDF; when two writers race on the same hash the first one wins
+    """
+    db.add(models.PdfRender(content_hash=content_hash, renderer_version=PDF_RENDERER_VERSION, pdf=pdf))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+def pdf_for_resume(db: Session, resume: models.Resume) -> bytes:
+    """
+    优先返回预渲染结果；未命中时当场渲染并存储
+    Serve the pre-rendered PDF, rendering (and storing) it on demand on a miss
+    """
+    pdf = get_stored_pdf(db, resume.content_hash)
+    if pdf is not None:
+        return pdf
+    pdf = render_resume_pdf(resume)
+    if resume.content_hash:
+        store_pdf(db, resume.content_hash, pdf)
+    return pdf
+
+def prune_pdf_renders() -> int:
+    """
+    清理无用的预渲染：旧渲染器版本的记录，以及没有对应简历 (content_hash) 的记录 (启动时执行)
+    Delete dead pre-renders at startup: rows from older renderer versions and rows whose
+    content_hash no longer belongs to any resume. Returns the number of rows removed.
+    """
+    db = SessionLocal()
+    try:
+        live_hashes = db.query(models.Resume.content_hash).filter(models.Resume.content_hash.is_not(None))
+        removed = db.query(models.PdfRender).filter(
+            (models.PdfRender.renderer_version != PDF_RENDERER_VERSION)
+            | models.PdfRender.content_hash.not_in(live_hashes)
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    if removed:
+        print(f"Pruned {removed} stale PDF renders")
+    return removed
+
+def prerender_pdfs(resume_ids: List[int]) -> None:
+    """
+    后台任务：为新保存的简历渲染并存储 PDF (失败只记录日志，下载时会按需重试)
+    Background job: render and store PDFs for newly saved resumes
+    (failures are only logged; the download path renders on demand instead)
+    """
+    db = SessionLocal()
+    try:
+        for resume_id in resume_ids:
+            try:
+                resume = db.get(models.Resume, resume_id)
+                if resume is None or not resume.content_hash:
+                    continue
+                if get_stored_pdf(db, resume.content_hash) is not None:
+                    continue
+                store_pdf(db, resume.content_hash, render_resume_pdf(resume))
+            except Exception as e:
+                print(f"PDF pre-render failed for resume {resume_id}: {e}")
+                db.rollback()
+    finally:
+        db.close()
+
+def _get_executor() -> ThreadPoolExecutor | None:
+    global _executor
+    if settings.pdf_prerender_workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.pdf_prerender_workers, thread_name_prefix="pdf-prerender"
+                )
+    return _executor
+
+def shutdown_prerender() -> None:
+    """
+    关闭后台渲染线程池 (丢弃尚未开始的任务)
+    Shut down the render pool, dropping jobs that have not started
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+# ---------------------------------------------------------------------------
+# 生成后的流水线阶段：任何提交了新 Resume 行的会话都会触发预渲染
+# Post-generation pipeline stage: any session that commits new Resume rows
+# (single generation, online batch, provider batch import) triggers a pre-render.
+# ---------------------------------------------------------------------------
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_new_resumes(session: Session, flush_context) -> None:
+    ids = [obj.id for obj in session.new if isinstance(obj, models.Resume)]
+    if ids:
+        session.info.setdefault(_PENDING_KEY, []).extend(ids)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _schedule_prerender(session: Session) -> None:
+    ids = session.info.pop(_PENDING_KEY, None)
+    executor = _get_executor() if ids else None
+    if executor is not None:
+        executor.submit(prerender_pdfs, ids)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
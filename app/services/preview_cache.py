@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from markupsafe import Markup
+
+from ..core import models
+from ..core.config import settings
+from ..core.profiling import phase
+from ..core.templating import TEMPLATES_DIR, asset_hash, templates
+from .resumes import compute_content_hash, load_resume_out
+
+# 预览片段模板；其源码哈希参与缓存键，模板修改后旧缓存自动失效
+# Preview fragment template; its source hash is part of the cache key so edits invalidate old entries
+PREVIEW_TEMPLATE = "resume_preview.html"
+
+class PreviewCache:
+    """
+    渲染后预览 HTML 的有界 LRU 缓存，可选磁盘二级缓存
+    Bounded LRU of rendered preview HTML with an optional on-disk second tier
+    """
+    # 每写入多少次磁盘缓存检查一次容量
+    # Check the disk tier size every this many writes
+    DISK_PRUNE_EVERY = 100
+
+    def __init__(self, max_entries: int, disk_dir: str = "", disk_max_entries: int = 0):
+        self.max_entries = max(1, max_entries)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_entries = disk_max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+        html = self._read_disk(key)
+        if html is not None:
+            self.disk_hits += 1
+            self._put_memory(key, html)
+            return html
+        self.misses += 1
+        return None
+
+    def put(self, key: str, html: str) -> None:
+        self._put_memory(key, html)
+        self._write_disk(key, html)
+
+    def _put_memory(self, key: str, html: str) -> None:
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str) -> str | None:
+        if not self.disk_dir:
+            return None
+        try:
+            return (self.disk_dir / f"{key}.html").read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, html: str) -> None:
+        if not self.disk_dir:
+            return
+        path = self.disk_dir / f"{key}.html"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(html, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Preview cache write failed: {e}")
+            return
+        self._disk_writes += 1
+        if self.disk_max_entries and self._disk_writes % self.DISK_PRUNE_EVERY == 0:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """
+        超出容量时删除最旧的磁盘缓存文件
+        Drop the oldest disk entries beyond the configured capacity
+        """
+        files = sorted(self.disk_dir.glob("*.html"), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.disk_max_entries)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+preview_cache = PreviewCache(
+    settings.preview_cache_size,
+    settings.preview_cache_dir,
+    settings.preview_cache_disk_max_entries,
+)
+
+_template_versions: dict[str, tuple[int, str]] = {}
+
+def _template_version(*names: str) -> str:
+    """
+    模板源码哈希 (文件未修改时复用)
+    Hash of template sources, reused while the files are unchanged
+    """
+    digest = hashlib.sha256()
+    for name in names:
+        cached = _template_versions.get(name)
+        if not cached or settings.template_auto_reload:
+            path = TEMPLATES_DIR / name
+            mtime = path.stat().st_mtime_ns
+            if not cached or cached[0] != mtime:
+                cached = (mtime, hashlib.sha256(path.read_bytes()).hexdigest()[:12])
+                _template_versions[name] = cached
+        digest.update(cached[1].encode())
+    return digest.hexdigest()[:12]
+
+def _content_hash(resume: models.Resume) -> str:
+    return resume.content_hash or compute_content_hash(resume.output_json, resume.ai_usage)
+
+def preview_etag(resume: models.Resume) -> str:
+    """
+    整页 ETag：内容哈希 + 页面模板版本 + 静态资源指纹
+    Page ETag: content hash + page template versions + static asset fingerprint
+    """
+    version = _template_version("base.html", "resume.html", PREVIEW_TEMPLATE)
+    return f'W/"{resume.id}-{_content_hash(resume)}-{version}-{asset_hash("style.css")}"'
+
+def render_preview(resume: models.Resume) -> Markup:
+    """
+    返回简历预览片段；命中缓存时跳过 JSON 解析与模板渲染
+    Return the preview fragment, skipping JSON parsing and rendering on a cache hit
+    """
+    key = f"{resume.id}-{_content_hash(resume)}-{_template_version(PREVIEW_TEMPLATE)}"
+    html = preview_cache.get(key)
+    if html is None:
+        try:
+            data = load_resume_out(resume.output_json, resume.output_version)
+        except ValueError:
+            # 无法校验的数据：按原始 JSON 尽量展示
+            # Data that fails validation is shown from the raw JSON as best we can
+            data = json.loads(resume.output_json)
+        with phase("json"):
+            usage = json.loads(resume.ai_usage) if resume.ai_usage else {}
+        html = templates.get_template(PREVIEW_TEMPLATE).render(
+            resume=data, usage=usage, resume_id=resume.id
+        )
+        preview_cache.put(key, html)
+    return Markup(html)
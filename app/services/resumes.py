@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable, Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..core import models
+from ..core.profiling import phase
+from ..core.schemas import ResumeOut
+
+# output_json 的存储格式版本
+# Storage format version of output_json
+#   1: 旧格式 personal_info / work_experience (start_date, end_date, description) / education (field_of_study, year)
+#      legacy shape: personal_info / work_experience (start_date, end_date, description) / education (field_of_study, year)
+#   2: 当前 ResumeOut (contact / experience / projects / education)
+#      current ResumeOut shape (contact / experience / projects / education)
+RESUME_SCHEMA_VERSION = 2
+
+# 旧格式特有的字段 (用于识别未标记版本的数据)
+# Keys only found in the legacy shape (used to detect unversioned rows)
+_LEGACY_KEYS = {"personal_info", "work_experience"}
+
+def compute_content_hash(output_json: str, ai_usage: str | None) -> str:
+    """
+    简历内容哈希 (输出 JSON + usage)，用于预览缓存与 ETag
+    Content hash of a saved resume (output JSON + usage), used for caching and ETags
+    """
+    digest = hashlib.sha256(output_json.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((ai_usage or "").encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+def create_resume(
+    db: Session,
+    *,
+    user_id: int,
+    input_data: Dict[str, Any],
+    resume_out: ResumeOut,
+    ai_usage: Dict[str, Any],
+    batch_id: int | None = None,
+    commit: bool = True,
+) -> models.Resume:
+    """
+    保存生成的简历 (单个生成与批量生成共用的写入路径)
+    Persist a generated resume (shared write path for single and batch generation)
+    """
+    output_json = resume_out.model_dump_json() # Pydantic v2
+    usage_json = json.dumps(ai_usage, ensure_ascii=False)
+    resume = models.Resume(
+        user_id=user_id,
+        input_json=json.dumps(input_data, ensure_ascii=False),
+        output_json=output_json,
+        ai_usage=usage_json,
+        content_hash=compute_content_hash(output_json, usage_json),
+        output_version=RESUME_SCHEMA_VERSION,
+        batch_id=batch_id,
+    )
+    db.add(resume)
+    if commit:
+        db.commit()
+        db.refresh(resume)
+    return resume
+
+def _migrate_v1(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    v1 -> v2：personal_info -> contact，work_experience -> experience，旧教育字段 -> major/end
+    v1 -> v2: personal_info -> contact, work_experience -> experience, old education fields -> major/end
+    """
+    migrated = {key: value for key, value in data.items() if key not in _LEGACY_KEYS}
+    migrated["contact"] = dict(data.get("personal_info") or {})
+    migrated["experience"] = [
+        {
+            "company": job.get("company", ""),
+            "role": job.get("role", ""),
+            "location": job.get("location", ""),
+            "start": job.get("start_date", ""),
+            "end": job.get("end_date", ""),
+            "bullets": list(job.get("description") or []),
+        }
+        for job in data.get("work_experience") or []
+    ]
+    migrated["education"] = [
+        {
+            "school": edu.get("school", ""),
+            "degree": edu.get("degree", ""),
+            "major": edu.get("major") or edu.get("field_of_study", ""),
+            "start": edu.get("start", ""),
+            "end": edu.get("end") or str(edu.get("year") or ""),
+        }
+        for edu in data.get("education") or []
+    ]
+    return migrated
+
+# 版本 n -> 版本 n + 1 的迁移函数
+# Migration from version n to version n + 1
+_MIGRATIONS: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    1: _migrate_v1,
+}
+
+def detect_output_version(data: Dict[str, Any]) -> int:
+    return 1 if _LEGACY_KEYS & data.keys() else RESUME_SCHEMA_VERSION
+
+def migrate_output(data: Dict[str, Any], version: int | None = None) -> Dict[str, Any]:
+    """
+    将任意旧版本的 output 数据升级到当前版本
+    Upgrade output data from any older version to the current one
+    """
+    version = version or detect_output_version(data)
+    while version < RESUME_SCHEMA_VERSION:
+        data = _MIGRATIONS[version](data)
+        version += 1
+    return data
+
+def load_resume_out(output_json: str, output_version: int | None) -> ResumeOut:
+    """
+    读取已保存的简历：当前版本的数据由本应用写入，直接解析校验，不做格式识别与迁移；
+    未迁移的旧数据才走识别 + 迁移的慢路径。
+    Load a saved resume. Current-version rows were written by this app and are parsed
+    straight into ResumeOut with no shape detection or migration; only unmigrated legacy
+    rows take the detect + migrate slow path.
+    json.loads + model_validate 在基准中快于 model_validate_json 与 model_construct
+    (见 scripts/bench_resume_load.py)。
+    json.loads + model_validate benchmarked faster than model_validate_json and
+    model_construct here (see scripts/bench_resume_load.py).
+    """
+    with phase("json"):
+        data = json.loads(output_json)
+        if output_version != RESUME_SCHEMA_VERSION:
+            data = migrate_output(data, output_version)
+        return ResumeOut.model_validate(data)
+
+def migrate_stored_resumes(conn: Connection, batch_size: int = 500) -> int:
+    """
+    一次性迁移：把未标记版本或旧版本的简历升级到当前格式并写回 (启动时执行，之后读取无需迁移)
+    One-time migration: upgrade unversioned or older rows to the current shape and write them
+    back (run at startup, so reads never migrate). Returns the number of rows upgraded.
+    """
+    migrated = 0
+    last_id = 0
+    select_pending = text(
+        "SELECT id, output_json, ai_usage, output_version FROM resumes "
+        "WHERE id > :last_id AND (output_version IS NULL OR output_version < :version) "
+        "ORDER BY id LIMIT :limit"
+    )
+    stamp_version = text("UPDATE resumes SET output_version = :version WHERE id = :id")
+    rewrite = text(
+        "UPDATE resumes SET output_json = :output_json, output_version = :version, "
+        "content_hash = :content_hash WHERE id = :id"
+    )
+    while True:
+        rows = conn.execute(
+            select_pending, {"last_id": last_id, "version": RESUME_SCHEMA_VERSION, "limit": batch_size}
+        ).fetchall()
+        if not rows:
+            break
+        for row_id, output_json, ai_usage, version in rows:
+            last_id = row_id
+            try:
+                data = json.loads(output_json)
+                resolved = version or detect_output_version(data)
+                if resolved == RESUME_SCHEMA_VERSION:
+                    # 已是当前格式：只校验并标记版本，不改写内容 (内容哈希不变)
+                    # Already current: validate and stamp the version without rewriting (hash unchanged)
+                    ResumeOut.model_validate(data)
+                    conn.execute(stamp_version, {"version": RESUME_SCHEMA_VERSION, "id": row_id})
+                    continue
+                new_json = ResumeOut.model_validate(migrate_output(data, resolved)).model_dump_json()
+            except ValueError as e:
+                print(f"Resume {row_id} left unmigrated: {e}")
+                continue
+            conn.execute(rewrite, {
+                "output_json": new_json,
+                "version": RESUME_SCHEMA_VERSION,
+                "content_hash": compute_content_hash(new_json, ai_usage),
+                "id": row_id,
+            })
+            migrated += 1
+        conn.commit()
+    return migrated
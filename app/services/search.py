@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.db import engine
+
+# 简历全文检索 (SQLite FTS5)。索引由 resumes 表上的触发器维护，任何写入路径都会同步。
+# Full-text search over saved resumes (SQLite FTS5). The index is kept in sync by
+# triggers on `resumes`, so every write path (single, batch, migrations) is covered.
+FTS_TABLE = "resumes_fts"
+
+# (列名, bm25 权重, 取值 SQL 模板)；{row} 为 new/old/resumes
+# (column, bm25 weight, SQL expression template); {row} is new / old / resumes
+FTS_COLUMNS = (
+    ("headline", 4.0, "json_extract({row}.output_json, '$.headline')"),
+    ("summary", 1.0, "json_extract({row}.output_json, '$.summary')"),
+    ("companies", 3.0,
+     "(SELECT group_concat(json_extract(value, '$.company'), ' ') "
+     "FROM json_each({row}.output_json, '$.experience'))"),
+    ("skills", 2.0, "(SELECT group_concat(value, ' ') FROM json_each({row}.output_json, '$.skills'))"),
+    ("job_desc", 1.0, "json_extract({row}.input_json, '$.job_desc')"),
+)
+
+# 使用 trigram 分词：中文没有空格分词，unicode61 会把 "高级后端工程师" 当成一个词，
+# 搜 "后端" 无法命中；trigram 按三字符子串建索引，中英文都支持子串匹配。
+# Trigram tokenizer: Chinese has no spaces, so unicode61 indexed "高级后端工程师" as a single
+# token and "后端" never matched. Trigrams index every 3-character substring, giving
+# substring matching for CJK and Latin text alike. Terms shorter than 3 characters
+# cannot use the index and fall back to LIKE over the user's own rows.
+_TOKENIZE = "tokenize = 'trigram'"
+_MIN_TERM = 3
+
+# owner 列存放由 user_id 编码出的 3 个私用区字符 (恰好一个 trigram，每个用户唯一)：
+# 用户过滤在倒排索引内完成，而不是匹配全部用户后再过滤
+# The `owner` column holds user_id encoded as 3 private-use characters: exactly one
+# trigram, unique per user, so per-user filtering happens inside the inverted index
+# instead of ranking every user's matches and filtering afterwards.
+_OWNER_BASE = 0xE000
+_OWNER_SQL = (
+    "char({base} + {{row}}.user_id % 4096, {base} + ({{row}}.user_id / 4096) % 4096, "
+    "{base} + ({{row}}.user_id / 16777216) % 4096)"
+).format(base=_OWNER_BASE)
+
+# LIKE 回退时拼接的检索文本 / Haystack searched by the LIKE fallback
+_HAYSTACK_SQL = " || ' ' || ".join(f"coalesce(f.{name}, '')" for name, _, _ in FTS_COLUMNS)
+
+# 高亮片段使用的占位符 (转义后再替换为 <mark>，避免注入)
+# Highlight sentinels, swapped for <mark> after escaping so snippets cannot inject HTML
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+_search_enabled = False
+
+def _values_sql(row: str) -> str:
+    """
+    触发器/回填中各列的取值表达式 (非法 JSON 时为 NULL，不阻塞写入)
+    Column value expressions; NULL for invalid JSON so indexing never blocks a write
+    """
+    guard = f"json_valid({row}.output_json) AND json_valid({row}.input_json)"
+    return ", ".join(
+        f"CASE WHEN {guard} THEN {expr.format(row=row)} END" for _, _, expr in FTS_COLUMNS
+    )
+
+def _insert_sql(row: str) -> str:
+    names = ", ".join(name for name, _, _ in FTS_COLUMNS)
+    return (
+        f"INSERT INTO {FTS_TABLE} (rowid, {names}, owner) "
+        f"SELECT {row}.id, {_values_sql(row)}, {_OWNER_SQL.format(row=row)}"
+    )
+
+def _owner_token(user_id: int) -> str:
+    """
+    与 _OWNER_SQL 相同的编码 / Same encoding as _OWNER_SQL
+    """
+    user_id = int(user_id)
+    return "".join(chr(_OWNER_BASE + (user_id >> shift) % 4096) for shift in (0, 12, 24))
+
+def _drop_index(conn: Connection) -> None:
+    for suffix in ("ai", "ad", "au"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+def _create_index(conn: Connection) -> None:
+    names = ", ".join(name for name, _, _ in FTS_COLUMNS)
+    existing = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    exists = existing is not None
+    if exists and _TOKENIZE not in existing[0]:
+        # 旧版 unicode61 索引：删除后按 trigram 重建
+        # Index from the old unicode61 layout: drop it and rebuild with trigrams
+        _drop_index(conn)
+        exists = False
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({names}, owner, {_TOKENIZE})"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON resumes BEGIN "
+        f"{_insert_sql('new')}; END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON resumes BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF output_json, input_json ON resumes BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; {_insert_sql('new')}; END"
+    )
+    if not exists:
+        # 首次建立索引：回填已有简历
+        # First run: backfill existing resumes
+        conn.exec_driver_sql(f"{_insert_sql('resumes')} FROM resumes")
+
+def _fts_unavailable(error: OperationalError) -> bool:
+    """
+    仅当 SQLite 缺少 FTS5 / trigram 支持时才视为不可用 (锁冲突等其他错误应重试)
+    Only a missing FTS5 module or trigram tokenizer means search is unavailable;
+    anything else (e.g. "database is locked") is a transient error worth retrying
+    """
+    message = str(error.orig if error.orig is not None else error)
+    return "no such module: fts5" in message or "no such tokenizer: trigram" in message
+
+def ensure_search_index(conn: Connection | None = None) -> bool:
+    """
+    创建 FTS5 虚拟表与同步触发器 (仅 SQLite；FTS5 不可用时关闭搜索，其他 OperationalError 向上抛出)
+    Create the FTS5 table and sync triggers (SQLite only). Search is disabled when FTS5
+    is unavailable; any other OperationalError propagates so init_database can retry.
+    """
+    global _search_enabled
+    if not settings.database_url.startswith("sqlite"):
+        _search_enabled = False
+        return False
+    try:
+        if conn is not None:
+            _create_index(conn)
+        else:
+            with engine.connect() as own_conn:
+                # BEGIN IMMEDIATE 先取得写锁：多个 worker 同时启动时，检查、建表与回填是原子的，
+                # 后到者等待后看到已建好的表，不会重复回填
+                # BEGIN IMMEDIATE takes the write lock up front, so the existence check, DDL and
+                # backfill are atomic: a second worker waits, then sees the finished table
+                # instead of backfilling the same rows again.
+                own_conn.exec_driver_sql("BEGIN IMMEDIATE")
+                _create_index(own_conn)
+                own_conn.commit()
+    except OperationalError as e:
+        if not _fts_unavailable(e):
+            raise
+        print(f"Full-text search disabled: {e}")
+        _search_enabled = False
+        return False
+    _search_enabled = True
+    return True
+
+def search_enabled() -> bool:
+    return _search_enabled
+
+def _split_terms(query: str) -> List[str]:
+    return [t for t in (t.replace('"', "") for t in re.split(r"\s+", query.strip())) if t]
+
+def build_match_query(terms: List[str], user_id: int) -> str:
+    """
+    将检索词转为安全的 FTS5 查询：每个词加引号 (trigram 下即子串匹配)，词之间为 AND，并限定 owner；
+    少于 3 个字符的词无法走索引，由调用方用 LIKE 处理
+    Turn search terms into a safe FTS5 query: every term quoted (a substring match under
+    trigrams) and ANDed, restricted to the owner's rows. Terms under 3 characters cannot
+    use the index and are left to the caller's LIKE filter.
+    """
+    phrases = [f'"{t}"' for t in terms if len(t) >= _MIN_TERM]
+    if not phrases:
+        return ""
+    names = " ".join(name for name, _, _ in FTS_COLUMNS)
+    return f'owner : "{_owner_token(user_id)}" AND {{{names}}} : ({" ".join(phrases)})'
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _highlight(snippet: str | None) -> Markup:
+    escaped = str(escape(snippet or ""))
+    return Markup(escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>"))
+
+def _like_snippet(values: List[str | None], terms: List[str], width: int = 32) -> str:
+    """
+    LIKE 回退路径的片段：取第一个命中列中首个命中位置附近的文本并加高亮占位符
+    Snippet for the LIKE fallback: text around the first hit in the first matching column,
+    with highlight sentinels around every term occurrence
+    """
+    lowered = [t.lower() for t in terms]
+    for value in values:
+        if not value:
+            continue
+        folded = value.lower()
+        hits = [folded.find(t) for t in lowered if t in folded]
+        if not hits:
+            continue
+        start = max(0, min(hits) - width // 2)
+        end = min(len(value), start + width * 2)
+        window = value[start:end]
+        pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+        window = pattern.sub(lambda m: f"{_MARK_OPEN}{m.group(0)}{_MARK_CLOSE}", window)
+        return ("…" if start > 0 else "") + window + ("…" if end < len(value) else "")
+    return ""
+
+def search_resumes(db: Session, user_id: int, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    检索当前用户的简历，按 bm25 排序并返回高亮片段 (仅含短词时按时间倒序)
+    Search the user's resumes, ranked by bm25, with highlighted snippets
+    (newest first when every term is too short for the index)
+    """
+    terms = _split_terms(query)
+    if not terms or not _search_enabled:
+        return []
+    match = build_match_query(terms, user_id)
+    short_terms = [t for t in terms if len(t) < _MIN_TERM]
+    params: Dict[str, Any] = {"user_id": user_id, "limit": limit}
+    like_sql = ""
+    for n, term in enumerate(short_terms):
+        like_sql += f" AND ({_HAYSTACK_SQL}) LIKE :like{n} ESCAPE '\\'"
+        params[f"like{n}"] = _like_pattern(term)
+
+    if match:
+        # owner 列权重为 0，不影响排序 / the owner column has weight 0 and never affects ranking
+        weights = ", ".join([str(weight) for _, weight, _ in FTS_COLUMNS] + ["0.0"])
+        rows = db.execute(text(
+            f"SELECT r.id, r.created_at, f.headline, "
+            f"snippet({FTS_TABLE}, -1, :mark_open, :mark_close, '…', 16) AS snippet, "
+            f"bm25({FTS_TABLE}, {weights}) AS score "
+            f"FROM {FTS_TABLE} AS f JOIN resumes AS r ON r.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND r.user_id = :user_id{like_sql} "
+            f"ORDER BY score LIMIT :limit"
+        ), {**params, "mark_open": _MARK_OPEN, "mark_close": _MARK_CLOSE, "match": match}).fetchall()
+        snippets = [row.snippet for row in rows]
+    else:
+        # 全部为短词：从 user_id 索引取该用户的简历，再按 rowid 读取索引列做 LIKE 过滤
+        # Only short terms: walk the user's rows via the user_id index and LIKE-filter
+        # the indexed columns fetched by rowid
+        names = ", ".join(f"f.{name}" for name, _, _ in FTS_COLUMNS)
+        rows = db.execute(text(
+            f"SELECT r.id, r.created_at, {names}, NULL AS score "
+            f"FROM resumes AS r JOIN {FTS_TABLE} AS f ON f.rowid = r.id "
+            f"WHERE r.user_id = :user_id{like_sql} "
+            f"ORDER BY r.created_at DESC, r.id DESC LIMIT :limit"
+        ), params).fetchall()
+        snippets = [
+            _like_snippet([getattr(row, name) for name, _, _ in FTS_COLUMNS], short_terms)
+            for row in rows
+        ]
+    return [
+        {
+            "id": row.id,
+            "created_at": row.created_at,
+            "headline": row.headline or "",
+            "snippet": _highlight(snippet),
+            "score": row.score,
+        }
+        for row, snippet in zip(rows, snippets)
+    ]
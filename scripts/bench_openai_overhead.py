@@ -0,0 +1,123 @@
+"""
+OpenAI 调用的本地开销基准：连接建立与结构化输出 Schema 构建 (使用本地桩 HTTP 服务，不访问 OpenAI)
+Per-call client overhead benchmark: connection setup and structured-output schema building,
+measured against a local stub HTTP server (never calls OpenAI).
+
+对比 / Compares:
+  fresh client + parse   每次调用新建客户端 (新 TCP 连接) 并由 beta.parse 重新生成 Schema
+                         new client (new TCP connection) per call, schema re-derived by beta.parse
+  shared client + parse  共享连接池，但每次仍重新生成 Schema
+                         shared pool, schema still re-derived on every call
+  shared tuned + cached  build_client() 的共享连接池 + 预构建 response_format + model_validate_json
+                         build_client() shared pool + cached response_format + model_validate_json
+
+Usage:
+    python -m scripts.bench_openai_overhead [--calls 200]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from app.core.schemas import ResumeOut  # noqa: E402
+from app.services import openai_client  # noqa: E402
+from scripts.bench_generation import SAMPLE  # noqa: E402
+
+MESSAGES = [{"role": "system", "content": "bench"}, {"role": "user", "content": "bench"}]
+
+def _completion_body() -> bytes:
+    return json.dumps({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-2024-08-06",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": SAMPLE.model_dump_json(), "refusal": None},
+        }],
+        "usage": {"prompt_tokens": 1200, "completion_tokens": 900, "total_tokens": 2100},
+    }).encode("utf-8")
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    桩 OpenAI 服务：任何 POST 都立即返回同一个 chat.completion (支持 keep-alive)
+    Stub OpenAI server: every POST immediately returns the same chat.completion (keep-alive capable)
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = _completion_body()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+def _time_calls(calls: int, fn) -> list[float]:
+    fn()  # 预热 / warm-up
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    from openai import OpenAI
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    schema_ms = _time_calls(args.calls, lambda: openai_client.response_format_for.__wrapped__(ResumeOut))
+    cached_ms = _time_calls(args.calls, lambda: openai_client.response_format_for(ResumeOut))
+
+    def fresh_parse():
+        with OpenAI(base_url=base_url) as client:
+            client.beta.chat.completions.parse(model="bench", messages=MESSAGES, response_format=ResumeOut)
+
+    shared = OpenAI(base_url=base_url)
+
+    def shared_parse():
+        shared.beta.chat.completions.parse(model="bench", messages=MESSAGES, response_format=ResumeOut)
+
+    openai_client.set_client(openai_client.build_client(base_url=base_url))
+
+    def tuned_cached():
+        parsed, _, _ = openai_client._structured_completion("bench", MESSAGES, ResumeOut)
+        assert parsed is not None
+
+    print(f"{'schema build (per call)':>24}: median {statistics.median(schema_ms):.3f}ms")
+    print(f"{'schema build (cached)':>24}: median {statistics.median(cached_ms):.4f}ms")
+    for label, fn in (
+        ("fresh client + parse", fresh_parse),
+        ("shared client + parse", shared_parse),
+        ("shared tuned + cached", tuned_cached),
+    ):
+        timings = _time_calls(args.calls, fn)
+        timings.sort()
+        print(
+            f"{label:>24}: median {statistics.median(timings):.2f}ms  "
+            f"p95 {timings[int(0.95 * len(timings)) - 1]:.2f}ms"
+        )
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+已保存简历的读取解析耗时基准 (每次读取 output_json -> ResumeOut)
+Per-read parse benchmark for saved resumes (output_json -> ResumeOut).
+
+对比 / Compares:
+  json.loads + ResumeOut(**data)   旧读取路径 / the previous read path
+  legacy v1 (migrate on read)      未迁移旧数据：json.loads + 迁移 + 校验 / unmigrated legacy row
+  load_resume_out (v2)             当前路径：json.loads + model_validate / current path
+  model_validate_json              pydantic-core 直接解析 JSON / pydantic-core parses the JSON itself
+  model_construct (no validation)  参考：跳过校验的嵌套构造 / reference: nested construct, no validation
+
+Usage:
+    python -m scripts.bench_resume_load [--reads 5000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from app.core.schemas import Contact, EducationItem, ExperienceItem, ProjectItem, ResumeOut  # noqa: E402
+from app.services.resumes import RESUME_SCHEMA_VERSION, load_resume_out  # noqa: E402
+from scripts.bench_generation import SAMPLE  # noqa: E402
+
+def _legacy_json(resume: ResumeOut) -> str:
+    """
+    把样例简历转换为 v1 旧格式
+    Convert the sample resume to the legacy v1 shape
+    """
+    data = resume.model_dump(exclude={"contact", "experience", "education"})
+    data["personal_info"] = resume.contact.model_dump()
+    data["work_experience"] = [
+        {"company": e.company, "role": e.role, "location": e.location,
+         "start_date": e.start, "end_date": e.end, "description": e.bullets}
+        for e in resume.experience
+    ]
+    data["education"] = [
+        {"school": e.school, "degree": e.degree, "field_of_study": e.major, "year": e.end}
+        for e in resume.education
+    ]
+    return json.dumps(data)
+
+def _construct(output_json: str) -> ResumeOut:
+    data = json.loads(output_json)
+    return ResumeOut.model_construct(
+        **{key: value for key, value in data.items() if key not in {"contact", "experience", "projects", "education"}},
+        contact=Contact.model_construct(**data["contact"]),
+        experience=[ExperienceItem.model_construct(**item) for item in data["experience"]],
+        projects=[ProjectItem.model_construct(**item) for item in data["projects"]],
+        education=[EducationItem.model_construct(**item) for item in data["education"]],
+    )
+
+def _time_us(reads: int, fn) -> float:
+    timings = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=5000)
+    args = parser.parse_args()
+
+    current = SAMPLE.model_dump_json()
+    legacy = _legacy_json(SAMPLE)
+    assert load_resume_out(current, RESUME_SCHEMA_VERSION) == SAMPLE
+    # v1 只有毕业年份，其余字段迁移后应一致
+    # v1 only stored the graduation year; everything else should survive the migration
+    assert load_resume_out(legacy, None).model_dump(exclude={"education"}) == SAMPLE.model_dump(exclude={"education"})
+
+    print(f"output_json: {len(current)} bytes")
+    for label, fn in (
+        ("json.loads + ResumeOut(**data)", lambda: ResumeOut(**json.loads(current))),
+        ("legacy v1 (migrate on read)", lambda: load_resume_out(legacy, None)),
+        ("load_resume_out (v2)", lambda: load_resume_out(current, RESUME_SCHEMA_VERSION)),
+        ("model_validate_json", lambda: ResumeOut.model_validate_json(current)),
+        ("model_construct (no validation)", lambda: _construct(current)),
+    ):
+        print(f"{label:>32}: median {_time_us(args.reads, fn):.1f}us per read")
+
+if __name__ == "__main__":
+    main()
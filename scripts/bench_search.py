@@ -0,0 +1,106 @@
+"""
+全文检索基准：在临时 SQLite 库中写入 N 份简历后测量查询延迟
+Full-text search benchmark: load N resumes into a scratch SQLite DB and time queries.
+
+Usage:
+    python -m scripts.bench_search [--rows 100000] [--users 200]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="resume_search_"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from app.core import models  # noqa: E402,F401  (registers tables)
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.services.search import ensure_search_index, search_resumes  # noqa: E402
+
+COMPANIES = ["Shopee", "ByteDance", "Grab", "Tencent", "Alibaba", "Sea", "Stripe", "Google", "Meituan", "Ant Group"]
+ROLES = ["Backend Engineer", "Data Analyst", "Frontend Engineer", "SRE", "ML Engineer", "Product Manager"]
+SKILLS = ["Python", "Go", "Java", "SQL", "Kafka", "Redis", "Kubernetes", "React", "PyTorch", "Spark", "FastAPI"]
+# 中文简历 (无空格分词)：检验 "后端" 能命中 "高级后端工程师"
+# Chinese resumes (no word spacing): checks that "后端" matches "高级后端工程师"
+ZH_COMPANIES = ["字节跳动", "腾讯", "阿里巴巴", "美团", "蚂蚁集团"]
+ZH_ROLES = ["高级后端工程师", "数据分析师", "前端开发工程师", "算法工程师", "产品经理"]
+
+def fake_row(i: int, users: int, rng: random.Random) -> tuple:
+    if i % 4 == 0:
+        company = rng.choice(ZH_COMPANIES)
+        role = rng.choice(ZH_ROLES)
+        output = {
+            "headline": f"{role}｜{'、'.join(rng.sample(SKILLS, 3))}",
+            "summary": f"{rng.randint(1, 12)}年{role}经验，负责高并发系统的设计与上线。",
+            "skills": rng.sample(SKILLS, 5),
+            "experience": [{"company": c, "role": role, "bullets": []} for c in rng.sample(ZH_COMPANIES, 2)],
+        }
+        inputs = {"job_desc": f"{company}招聘{role}，要求熟悉{'、'.join(rng.sample(SKILLS, 4))}。"}
+        return (i, i % users + 1, json.dumps(inputs, ensure_ascii=False), json.dumps(output, ensure_ascii=False))
+    company = rng.choice(COMPANIES)
+    role = rng.choice(ROLES)
+    output = {
+        "headline": f"{role} | {' '.join(rng.sample(SKILLS, 3))}",
+        "summary": f"{role} with {rng.randint(1, 12)} years of experience shipping production systems.",
+        "skills": rng.sample(SKILLS, 5),
+        "experience": [{"company": c, "role": role, "bullets": []} for c in rng.sample(COMPANIES, 2)],
+    }
+    inputs = {"job_desc": f"{company} is hiring a {role}. Requirements: {', '.join(rng.sample(SKILLS, 4))}."}
+    return (i, i % users + 1, json.dumps(inputs), json.dumps(output))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index()
+
+    rng = random.Random(42)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, email, password_hash, created_at) VALUES (?, ?, 'x', CURRENT_TIMESTAMP)",
+            [(u, f"user{u}@example.com") for u in range(1, args.users + 1)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO resumes (id, user_id, input_json, output_json, created_at) "
+            "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            [fake_row(i, args.users, rng) for i in range(1, args.rows + 1)],
+        )
+    print(f"indexed {args.rows} resumes in {time.perf_counter() - start:.1f}s (triggers)")
+
+    query_sets = {
+        "latin": ["shopee backend", "python kafka", "data analyst", "Grab", "react front", "pytorch ml"],
+        # "后端"/"腾讯" 少于 3 个字符，走 LIKE 回退 / under 3 characters: LIKE fallback
+        "chinese": ["后端", "高级后端工程师", "字节跳动 python", "数据分析", "腾讯", "算法 PyTorch"],
+    }
+    db = SessionLocal()
+    try:
+        # 中文子串必须能命中 / Chinese substrings must match
+        assert search_resumes(db, 4 % args.users + 1, "后端") or args.rows < 4 * args.users
+        for label, queries in query_sets.items():
+            timings = []
+            for n in range(args.queries):
+                start = time.perf_counter()
+                search_resumes(db, rng.randint(1, args.users), queries[n % len(queries)])
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"{label} search over {args.rows} rows: median {statistics.median(timings):.2f}ms  "
+                f"p95 {timings[int(0.95 * len(timings)) - 1]:.2f}ms  max {timings[-1]:.2f}ms"
+            )
+    finally:
+        db.close()
+        os.remove(DB_PATH)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+启动性能基准：import 耗时、首个请求耗时 (time-to-first-request) 与就绪耗时
+Startup benchmark: import time, time-to-first-request and time-to-ready.
+
+每次测量都在新的子进程中运行，使用临时 SQLite 库。
+Every measurement runs in a fresh subprocess against a scratch SQLite database.
+
+Usage:
+    python -m scripts.bench_startup [--runs 3]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+def _env(db_dir: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    env["TEMPLATE_CACHE_DIR"] = os.path.join(db_dir, "jinja")
+    return env
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+def measure_import(db_dir: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=ROOT, env=_env(db_dir), capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+def measure_server(db_dir: str) -> tuple[float, float]:
+    """
+    启动 uvicorn，返回 (首个成功请求耗时, /readyz 就绪耗时)
+    Start uvicorn and return (time to first successful request, time until /readyz is 200)
+    """
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(db_dir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_request = ready = None
+    try:
+        deadline = start + 60
+        while time.perf_counter() < deadline and (first_request is None or ready is None):
+            if first_request is None and _status(f"{base}/login") == 200:
+                first_request = time.perf_counter() - start
+            if ready is None and _status(f"{base}/readyz") == 200:
+                ready = time.perf_counter() - start
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    if first_request is None or ready is None:
+        raise RuntimeError("server did not become ready within 60s")
+    return first_request, ready
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    imports, firsts, readies = [], [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="resume_startup_") as db_dir:
+            imports.append(measure_import(db_dir))
+            first, ready = measure_server(db_dir)
+            firsts.append(first)
+            readies.append(ready)
+
+    for label, values in (("import app.main", imports), ("first request", firsts), ("ready (/readyz)", readies)):
+        print(f"{label:>16}: median {statistics.median(values) * 1000:.0f}ms  max {max(values) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+准入控制 RouteLimiter 的测试：拒绝路径、排队交接、取消，且任何路径都不泄漏槽位
+Tests for the admission RouteLimiter: rejection paths, queue handoff and cancellation,
+checking that no path leaks a global or per-user slot
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.core.admission import Rejected, RouteLimiter
+
+def make_limiter(**overrides) -> RouteLimiter:
+    config = {
+        "name": "test",
+        "methods": ["POST"],
+        "path": r"^/test$",
+        "global_concurrency": 1,
+        "per_user_concurrency": 1,
+        "rate_per_minute": 0,
+        "burst": 1,
+        "max_queue": 1,
+        "queue_timeout": 5.0,
+    }
+    config.update(overrides)
+    return RouteLimiter(**config)
+
+def assert_idle(limiter: RouteLimiter) -> None:
+    assert limiter.active == 0
+    assert limiter.user_active == {}
+    assert not limiter.waiters
+
+async def _settle() -> None:
+    # 让排队中的任务运行到 await 处 / let queued tasks run up to their await
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+def test_queue_full_rejects_with_503():
+    async def scenario():
+        limiter = make_limiter(max_queue=0)
+        await limiter.acquire("user:a")
+        with pytest.raises(Rejected) as excinfo:
+            await limiter.acquire("user:b")
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.retry_after >= 1
+        assert limiter.counters["rejected_queue_full"] == 1
+        assert "user:b" not in limiter.user_active
+        limiter.release("user:a", 0.1)
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
+
+def test_queue_timeout_rejects_with_503():
+    async def scenario():
+        limiter = make_limiter(queue_timeout=0.05)
+        await limiter.acquire("user:a")
+        with pytest.raises(Rejected) as excinfo:
+            await limiter.acquire("user:b")
+        assert excinfo.value.status_code == 503
+        assert limiter.counters["rejected_queue_timeout"] == 1
+        limiter.release("user:a", 0.1)
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
+
+def test_release_hands_slot_to_first_waiter():
+    async def scenario():
+        limiter = make_limiter(max_queue=2)
+        await limiter.acquire("user:a")
+        first = asyncio.create_task(limiter.acquire("user:b"))
+        second = asyncio.create_task(limiter.acquire("user:c"))
+        await _settle()
+        assert len(limiter.waiters) == 2
+
+        limiter.release("user:a", 0.1)
+        await first
+        # 槽位直接交接：active 不变，第二个等待者仍在排队
+        # Handed over directly: active stays at 1 and the second waiter keeps queueing
+        assert limiter.active == 1
+        assert not second.done()
+
+        limiter.release("user:b", 0.1)
+        await second
+        limiter.release("user:c", 0.1)
+        assert_idle(limiter)
+        assert limiter.counters["admitted"] == 3
+        assert limiter.counters["queued"] == 2
+
+    asyncio.run(scenario())
+
+def test_cancel_while_queued_frees_queue_and_user_slots():
+    async def scenario():
+        limiter = make_limiter()
+        await limiter.acquire("user:a")
+        waiter = asyncio.create_task(limiter.acquire("user:b"))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not limiter.waiters
+        assert "user:b" not in limiter.user_active
+
+        # 已取消的等待者不会拿走槽位 / a cancelled waiter never receives the slot
+        limiter.release("user:a", 0.1)
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
+
+def test_cancel_after_handoff_returns_the_slot():
+    async def scenario():
+        limiter = make_limiter()
+        await limiter.acquire("user:a")
+        waiter = asyncio.create_task(limiter.acquire("user:b"))
+        await _settle()
+        # 槽位已交给等待者，但它在恢复运行前被取消：要么归还槽位并抛出 CancelledError，
+        # 要么 (wait_for 已拿到结果时) 正常返回并持有槽位，由调用方释放；两种情况都不能泄漏
+        # The slot is handed over, then the waiter is cancelled before it resumes. It either
+        # gives the slot back and raises CancelledError, or (when wait_for already has the
+        # result) returns holding the slot for the caller to release. Neither may leak.
+        limiter.release("user:a", 0.1)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        else:
+            assert limiter.active == 1
+            assert limiter.user_active == {"user:b": 1}
+            limiter.release("user:b", 0.1)
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
+
+def test_per_user_concurrency_rejects_with_429():
+    async def scenario():
+        limiter = make_limiter(global_concurrency=4)
+        await limiter.acquire("user:a")
+        with pytest.raises(Rejected) as excinfo:
+            await limiter.acquire("user:a")
+        assert excinfo.value.status_code == 429
+        assert limiter.counters["rejected_user_concurrency"] == 1
+        # 其他用户不受影响 / other users are unaffected
+        await limiter.acquire("user:b")
+        limiter.release("user:a", 0.1)
+        limiter.release("user:b", 0.1)
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
+
+def test_rate_limit_rejects_with_429():
+    async def scenario():
+        limiter = make_limiter(rate_per_minute=1, burst=1)
+        await limiter.acquire("user:a")
+        limiter.release("user:a", 0.1)
+        with pytest.raises(Rejected) as excinfo:
+            await limiter.acquire("user:a")
+        assert excinfo.value.status_code == 429
+        assert excinfo.value.retry_after > 1
+        assert limiter.counters["rejected_rate_limit"] == 1
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
+
+def test_middleware_releases_slot_before_background_tasks():
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.background import BackgroundTask
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    from app.core.admission import AdmissionController, AdmissionMiddleware
+
+    controller = AdmissionController({"test": {
+        "methods": ["POST"], "path": r"^/test$", "global_concurrency": 1, "per_user_concurrency": 1,
+        "rate_per_minute": 0, "burst": 1, "max_queue": 0, "queue_timeout": 1.0,
+    }})
+    limiter = controller.limiters[0]
+    seen = {}
+
+    async def background() -> None:
+        seen["active"] = limiter.active
+        seen["user_active"] = dict(limiter.user_active)
+
+    async def endpoint(request):
+        return PlainTextResponse("ok", background=BackgroundTask(background))
+
+    app = AdmissionMiddleware(Starlette(routes=[Route("/test", endpoint, methods=["POST"])]), controller)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.post("/test")
+        assert response.status_code == 200
+        # 后台任务运行时槽位已归还 / the slot is already free while the background task runs
+        assert seen == {"active": 0, "user_active": {}}
+        assert_idle(limiter)
+
+    asyncio.run(scenario())
@@ -0,0 +1,35 @@
+"""
+PDF 排版测试：无空格的中文长段落必须按宽度换行
+PDF layout tests: long Chinese paragraphs without spaces must wrap to the page width
+"""
+from __future__ import annotations
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+
+from app.core.schemas import Contact, ResumeOut
+from app.services.pdf_export import LEFT, RIGHT, build_resume_pdf, register_fonts, wrap_text
+
+MAX_WIDTH = A4[0] - LEFT - RIGHT
+
+CJK_SUMMARY = "负责高并发支付系统的架构设计与性能优化，带领团队完成核心服务的微服务化改造。" * 7
+
+def test_long_cjk_paragraph_wraps_within_page_width():
+    font = register_fonts()
+    lines = wrap_text(CJK_SUMMARY, font, 10, MAX_WIDTH)
+    assert len(lines) > 1
+    assert "".join(lines) == CJK_SUMMARY
+    for line in lines:
+        assert pdfmetrics.stringWidth(line, font, 10) <= MAX_WIDTH
+
+def test_mixed_text_still_breaks_at_spaces():
+    font = register_fonts()
+    text = "Built payments APIs " * 30
+    lines = wrap_text(text, font, 10, MAX_WIDTH)
+    assert len(lines) > 1
+    assert all(not line.startswith(" ") and pdfmetrics.stringWidth(line, font, 10) <= MAX_WIDTH for line in lines)
+    assert " ".join(lines).split() == text.split()
+
+def test_renders_resume_with_long_cjk_summary():
+    pdf = build_resume_pdf(ResumeOut(contact=Contact(name="张三"), summary=CJK_SUMMARY, skills=["Python"]))
+    assert pdf.startswith(b"%PDF")
@@ -0,0 +1,103 @@
+"""
+启动时 output_json 迁移 (migrate_stored_resumes) 的测试
+Tests for the startup output_json migration (migrate_stored_resumes)
+"""
+from __future__ import annotations
+
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import models  # noqa: F401  (registers tables)
+from app.core.db import Base
+from app.core.schemas import Contact, ExperienceItem, ResumeOut
+from app.services.resumes import RESUME_SCHEMA_VERSION, compute_content_hash, migrate_stored_resumes
+
+LEGACY_V1 = {
+    "language": "en",
+    "personal_info": {"name": "Jane Doe", "email": "jane@example.com"},
+    "headline": "Backend Engineer",
+    "work_experience": [
+        {"company": "Shopee", "role": "Engineer", "start_date": "2020", "end_date": "2023",
+         "description": ["Built payments APIs"]},
+    ],
+    "education": [{"school": "NUS", "degree": "BSc", "field_of_study": "CS", "year": 2019}],
+    "skills": ["Python"],
+}
+
+CURRENT = ResumeOut(
+    language="en",
+    contact=Contact(name="John Roe"),
+    headline="Data Analyst",
+    experience=[ExperienceItem(company="Grab", role="Analyst")],
+).model_dump_json()
+
+# 无旧格式字段，但 contact 类型错误：校验失败，应原样保留
+# No legacy keys, but contact has the wrong type: fails validation and must be left untouched
+INVALID = json.dumps({"contact": "not an object", "headline": "Broken"})
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migration.db'}")
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        (1, json.dumps(LEGACY_V1), '{"total_tokens": 10}'),
+        (2, CURRENT, None),
+        (3, INVALID, None),
+    ]
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, password_hash, created_at) "
+            "VALUES (1, 'test@example.com', 'x', CURRENT_TIMESTAMP)"
+        ))
+        for row_id, output_json, ai_usage in rows:
+            conn.execute(text(
+                "INSERT INTO resumes (id, user_id, input_json, output_json, ai_usage, content_hash, created_at) "
+                "VALUES (:id, 1, '{}', :output_json, :ai_usage, :content_hash, CURRENT_TIMESTAMP)"
+            ), {
+                "id": row_id,
+                "output_json": output_json,
+                "ai_usage": ai_usage,
+                "content_hash": compute_content_hash(output_json, ai_usage),
+            })
+    yield engine
+    engine.dispose()
+
+def _rows(engine) -> dict:
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT id, output_json, output_version, content_hash, ai_usage FROM resumes"))
+        return {row.id: row for row in result}
+
+def test_migrates_v1_stamps_current_and_skips_invalid(engine):
+    with engine.connect() as conn:
+        # batch_size=1：覆盖分页 / batch_size=1 exercises paging
+        assert migrate_stored_resumes(conn, batch_size=1) == 1
+    rows = _rows(engine)
+
+    legacy = rows[1]
+    assert legacy.output_version == RESUME_SCHEMA_VERSION
+    resume = ResumeOut.model_validate_json(legacy.output_json)
+    assert resume.contact.name == "Jane Doe"
+    assert resume.experience[0].start == "2020"
+    assert resume.experience[0].bullets == ["Built payments APIs"]
+    assert resume.education[0].major == "CS"
+    assert resume.education[0].end == "2019"
+    assert legacy.content_hash == compute_content_hash(legacy.output_json, legacy.ai_usage)
+
+    current = rows[2]
+    assert current.output_version == RESUME_SCHEMA_VERSION
+    assert current.output_json == CURRENT
+    assert current.content_hash == compute_content_hash(CURRENT, None)
+
+    invalid = rows[3]
+    assert invalid.output_version is None
+    assert invalid.output_json == INVALID
+
+def test_second_run_is_a_no_op(engine):
+    with engine.connect() as conn:
+        migrate_stored_resumes(conn)
+    before = _rows(engine)
+    with engine.connect() as conn:
+        assert migrate_stored_resumes(conn) == 0
+    assert _rows(engine) == before